@@ -3,24 +3,314 @@
 
 import argparse
 import os
+import shutil
+import stat
 import sys
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Tuple
 
 # Import local modules
 from src.audio import AudioProcessor
 from src.player import KaraokePlayer
-from src.transcription import Transcription, TranscriptionProcessor
+from src.transcription import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_WHISPER_CPP_MODEL,
+    DEFAULT_WHISPER_MODEL,
+    DEFAULT_WHISPER_MULTILINGUAL_MODEL,
+    Transcription,
+    TranscriptionProcessor,
+)
 from src.utils import (
+    cache_file,
     cleanup_temp_dir,
     create_project_dir,
     create_temp_dir,
+    get_cache_dir,
+    get_cache_key,
+    get_env_flag,
     get_env_path,
+    hash_file,
+    link_or_copy,
+    prune_cache,
 )
 
 # Default constants
-DEFAULT_WHISPER_MODEL = "models/ggml-large-v2.bin"  # Have best results for both English and Chinese
 DEFAULT_WHISPER_SH_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts", "whisper.sh")
 
 
+@dataclass
+class PipelineContext:
+    """Processors shared by every song in a run, so loaded models are reused between songs."""
+
+    audio_processor: AudioProcessor
+    transcription_processor: TranscriptionProcessor
+
+
+def prepare_wav(input_file: str, wav_path: str, audio_processor: AudioProcessor) -> bool:
+    """Convert the input to the WAV used for separation, or link it if it already is one.
+
+    Args:
+        input_file: Path to the input audio or video file
+        wav_path: Path where the WAV file should be available
+        audio_processor: Processor used for the conversion
+
+    Returns:
+        True if the WAV file is ready, False otherwise
+    """
+    if audio_processor.is_pcm_wav(input_file):
+        print(f"Input is already a PCM WAV file, skipping conversion: {input_file}")
+        try:
+            link_or_copy(input_file, wav_path)
+        except OSError as e:
+            print(f"Error linking {input_file} to {wav_path}: {e}")
+            return False
+        return True
+    return audio_processor.convert_to_wav(input_file, wav_path)
+
+
+def get_cache_paths(
+    input_file: str, args: argparse.Namespace, context: PipelineContext
+) -> Optional[Tuple[str, str, str]]:
+    """Get where the results for a song are cached, keyed by its content and the backends that produce them.
+
+    Args:
+        input_file: Path to the input audio or video file
+        args: Parsed command line arguments
+        context: Processors shared by all songs in the run
+
+    Returns:
+        Tuple of cached (instrumental_path, vocals_path, transcription_file), or None if the input cannot be read
+    """
+    try:
+        input_hash = hash_file(input_file)
+    except OSError as e:
+        print(f"Warning: Failed to read {input_file}, not using the cache: {e}")
+        return None
+
+    cache_dir = get_cache_dir()
+    stem_key = get_cache_key(input_hash, context.audio_processor.get_separator_name())
+    model_name = context.transcription_processor.get_model_name(args.language)
+    return (
+        os.path.join(cache_dir, f"{stem_key}_Instruments.wav"),
+        os.path.join(cache_dir, f"{stem_key}_Vocals.wav"),
+        os.path.join(cache_dir, f"{get_cache_key(input_hash, model_name, args.language)}.json"),
+    )
+
+
+def needs_wav(input_file: str, args: argparse.Namespace, context: PipelineContext) -> bool:
+    """Check if a song has to be converted to WAV, which is only skipped when its separated stems are reused.
+
+    Args:
+        input_file: Path to the input audio or video file
+        args: Parsed command line arguments
+        context: Processors shared by all songs in the run
+
+    Returns:
+        True if the WAV file is needed, False if the stems are in the project directory or the cache
+    """
+    if args.skip_separation:
+        return True
+    project_dir, base_name = create_project_dir(input_file, args.output_dir)
+    stem_paths = [os.path.join(project_dir, f"{base_name}_{stem}.wav") for stem in ("Instruments", "Vocals")]
+    if all(os.path.exists(path) for path in stem_paths):
+        return False
+    cache_paths = get_cache_paths(input_file, args, context)
+    return cache_paths is None or not (os.path.exists(cache_paths[0]) and os.path.exists(cache_paths[1]))
+
+
+def prefetch_wav(input_file: str, wav_path: str, args: argparse.Namespace, context: PipelineContext) -> Optional[bool]:
+    """Convert a song to WAV ahead of processing it, unless its separated stems can be reused.
+
+    Args:
+        input_file: Path to the input audio or video file
+        wav_path: Path where the WAV file should be available
+        args: Parsed command line arguments
+        context: Processors shared by all songs in the run
+
+    Returns:
+        True if the WAV file is ready, False if the conversion failed, or None if the song does not need it
+    """
+    if not needs_wav(input_file, args, context):
+        return None
+    return prepare_wav(input_file, wav_path, context.audio_processor)
+
+
+def process_song(
+    input_file: str,
+    args: argparse.Namespace,
+    context: PipelineContext,
+    temp_dir: str,
+    conversion: Optional[Future] = None,
+) -> Optional[Tuple[str, Optional[str], Transcription]]:
+    """Convert, separate and transcribe one song, reusing results from previous runs where possible.
+
+    Args:
+        input_file: Path to the input audio or video file
+        args: Parsed command line arguments
+        context: Processors shared by all songs in the run
+        temp_dir: Temporary directory for intermediate files
+        conversion: Optional prefetch_wav call already started in the background for this song
+
+    Returns:
+        Tuple of (instrumental_path, vocals_path, transcription), or None on failure
+    """
+    # Create a project directory
+    project_dir, base_name = create_project_dir(input_file, args.output_dir)
+
+    # Set up the expected file paths
+    wav_path = os.path.join(temp_dir, f"{base_name}.wav")
+    instrumental_path = os.path.join(project_dir, f"{base_name}_Instruments.wav")
+    vocals_path = os.path.join(project_dir, f"{base_name}_Vocals.wav")
+    transcription_file = os.path.join(project_dir, f"{base_name}_transcription.json")
+    whisper_output_dir = os.path.join(project_dir, "whisper_output")
+
+    # List the project directory once instead of checking each file separately,
+    # skipping symlinks whose cached target has been removed
+    present = {entry.name for entry in os.scandir(project_dir) if not entry.is_symlink() or os.path.exists(entry.path)}
+    stems_found = os.path.basename(instrumental_path) in present and os.path.basename(vocals_path) in present
+    model_name = context.transcription_processor.get_model_name(args.language)
+
+    # Reuse the transcription from a previous run if it was made with the same language and model
+    transcription = None
+    if os.path.basename(transcription_file) in present:
+        transcription = Transcription().load_from_file(transcription_file)
+        if not transcription:
+            if args.skip_transcription:
+                print(f"Error loading transcription from {transcription_file}")
+                return None
+        elif not args.skip_transcription and not transcription.matches(args.language, model_name):
+            print("Transcription was made with another language or model, transcribing again")
+            transcription = None
+
+    # Check if all target files exist already
+    if stems_found and transcription and not args.skip_separation:
+        print("All target files found. Loading directly...")
+    else:
+        # Results are cached by input content, so the same song is recognized under another name
+        cache_dir = get_cache_dir()
+        cache_paths = get_cache_paths(input_file, args, context)
+        cached_instrumental_path, cached_vocals_path, cached_transcription_file = cache_paths or (None, None, None)
+        # Checked once, the cached transcription is only written after transcribing
+        cached_transcription_found = (
+            cache_paths is not None
+            and not transcription
+            and not args.skip_transcription
+            and os.path.exists(cached_transcription_file)
+        )
+        if (
+            cache_paths is not None
+            and not stems_found
+            and not args.skip_separation
+            and os.path.exists(cached_instrumental_path)
+            and os.path.exists(cached_vocals_path)
+        ):
+            print(f"Using cached separated tracks from {cache_dir}")
+            # Mark the stems as recently used, so they are the last to be pruned
+            os.utime(cached_instrumental_path)
+            os.utime(cached_vocals_path)
+            link_or_copy(cached_instrumental_path, instrumental_path)
+            link_or_copy(cached_vocals_path, vocals_path)
+            stems_found = True
+
+        # Convert input to WAV, only needed when the stems are not reused
+        if args.skip_separation or not stems_found:
+            converted = None
+            if conversion is not None:
+                try:
+                    converted = conversion.result()
+                except Exception as e:
+                    # Raised in the background job, only this song is affected
+                    print(f"Warning: Background conversion of {input_file} failed, converting again: {e}")
+            if converted is None:
+                # Not converted ahead, or the stems it expected to reuse are gone
+                converted = prepare_wav(input_file, wav_path, context.audio_processor)
+            if not converted:
+                print("Error converting input file to WAV format")
+                return None
+
+        # Separate vocals if requested and the stems from a previous run are missing
+        if args.skip_separation:
+            instrumental_path = wav_path
+            vocals_path = None
+        elif stems_found:
+            print("Separated tracks found, skipping separation")
+        else:
+            instrumental_path = wav_path
+            vocals_path = None
+            if context.audio_processor.use_script and not args.vocal_remover_path:
+                print("Warning: vocal-remover path not specified and Demucs not installed, skipping separation")
+            else:
+                # Load the whisper model in the background while the vocals are separated
+                needs_transcription = (
+                    not args.skip_transcription and not transcription and not cached_transcription_found
+                )
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    if needs_transcription:
+                        executor.submit(context.transcription_processor.preload_model, args.language)
+                    instrumental_path, vocals_path = context.audio_processor.separate_vocals(wav_path, project_dir)
+                if not instrumental_path:
+                    print("Warning: Vocal separation failed, using original audio")
+                    instrumental_path = wav_path
+                elif cache_paths is not None:
+                    # Keep a single copy of each stem in the cache, linked into the project.
+                    # If the cache is pruned while a stem is only symlinked, it is separated again.
+                    try:
+                        cache_file(instrumental_path, cached_instrumental_path)
+                        cache_file(vocals_path, cached_vocals_path)
+                        prune_cache(cache_dir)
+                    except OSError as e:
+                        print(f"Warning: Failed to cache separated tracks: {e}")
+
+        if transcription:
+            print("Transcription found, skipping transcription")
+        elif cached_transcription_found:
+            transcription = Transcription().load_from_file(cached_transcription_file)
+            if transcription:
+                print(f"Using cached transcription from {cache_dir}")
+                transcription.save_to_file(transcription_file)
+
+        # Process transcription
+        if not transcription and not args.skip_transcription:
+            # Check if whisper_output_dir exists and no valid transcription is found,
+            # if so, delete it to ensure a fresh transcription
+            if os.path.basename(whisper_output_dir) in present:
+                print(f"Removing old whisper output directory: {whisper_output_dir}")
+                try:
+                    shutil.rmtree(whisper_output_dir)
+                except Exception as e:
+                    print(f"Warning: Failed to remove old whisper output directory: {e}")
+
+            transcription_audio = vocals_path if vocals_path else wav_path
+            if not context.transcription_processor.use_script:
+                # Downsample once to the 16 kHz mono whisper works on, whisper.sh does this by itself
+                asr_wav_path = os.path.join(temp_dir, f"{base_name}_asr.wav")
+                if context.audio_processor.is_pcm_wav(transcription_audio, for_asr=True):
+                    print(f"Audio is already 16 kHz mono, skipping conversion: {transcription_audio}")
+                elif context.audio_processor.convert_to_wav(transcription_audio, asr_wav_path, for_asr=True):
+                    transcription_audio = asr_wav_path
+            print(f"Using audio for transcription: {transcription_audio}")
+
+            # Pass the whisper_output_dir to ensure output is saved in the project folder
+            transcription = context.transcription_processor.transcribe(
+                transcription_audio, args.language, output_dir=whisper_output_dir
+            )
+
+            if transcription:
+                transcription.save_to_file(transcription_file)
+                # Only the project copy is meant to be read or edited by hand
+                if cache_paths is not None:
+                    transcription.save_to_file(cached_transcription_file, indent=False)
+            else:
+                print("Error: Transcription failed")
+                return None
+        elif not transcription:
+            print(f"Error: No transcription file found at {transcription_file} and --skip-transcription specified")
+            return None
+
+    return instrumental_path, vocals_path, transcription
+
+
 def main() -> int:
     """Run the main application flow.
 
@@ -30,9 +320,16 @@ def main() -> int:
     # Load environment variables
     whisper_cpp_path = get_env_path("WHISPER_CPP_PATH")
     vocal_remover_path = get_env_path("VOCAL_REMOVER_PATH")
+    vocal_remover_use_script = get_env_flag("VOCAL_REMOVER_USE_SCRIPT")
+    whisper_use_script = get_env_flag("WHISPER_USE_SCRIPT")
 
     parser = argparse.ArgumentParser(description="Songs to Karaoke - Create karaoke versions with transcribed lyrics")
-    parser.add_argument("input_file", help="Input audio or video file")
+    parser.add_argument(
+        "input_files",
+        metavar="input_file",
+        nargs="+",
+        help="Input audio or video files, played one after another",
+    )
     parser.add_argument(
         "--vocal-remover",
         dest="vocal_remover_path",
@@ -42,8 +339,18 @@ def main() -> int:
     parser.add_argument(
         "--whisper-model",
         dest="whisper_model",
-        default=DEFAULT_WHISPER_MODEL,
-        help=f"Whisper model name (default: {DEFAULT_WHISPER_MODEL})",
+        help=(
+            f"Whisper model name (default: {DEFAULT_WHISPER_MODEL} for English, "
+            f"{DEFAULT_WHISPER_MULTILINGUAL_MODEL} for Chinese, or {DEFAULT_WHISPER_CPP_MODEL} when using whisper.sh)"
+        ),
+    )
+    parser.add_argument(
+        "--batch-size",
+        dest="batch_size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Number of speech chunks transcribed together by faster-whisper, 1 disables batching "
+        f"(default: {DEFAULT_BATCH_SIZE})",
     )
     parser.add_argument(
         "--language",
@@ -67,110 +374,86 @@ def main() -> int:
 
     args = parser.parse_args()
 
-    # Check if input file exists
-    if not os.path.exists(args.input_file):
-        print(f"Error: Input file not found: {args.input_file}")
-        return 1
-
-    # Create a project directory
-    project_dir, base_name = create_project_dir(args.input_file, args.output_dir)
+    # Create the processors once, the models they load stay cached for the following songs
+    context = PipelineContext(
+        audio_processor=AudioProcessor(args.vocal_remover_path, use_script=vocal_remover_use_script),
+        transcription_processor=TranscriptionProcessor(
+            DEFAULT_WHISPER_SH_PATH,
+            args.whisper_model,
+            whisper_cpp_path=whisper_cpp_path,
+            use_script=whisper_use_script,
+            batch_size=args.batch_size,
+        ),
+    )
 
     # Create temp directory
     temp_dir = create_temp_dir()
     print(f"Using temporary directory: {temp_dir}")
 
-    # Set up the expected file paths
-    wav_path = os.path.join(temp_dir, f"{base_name}.wav")
-    instrumental_path = os.path.join(project_dir, f"{base_name}_Instruments.wav")
-    vocals_path = os.path.join(project_dir, f"{base_name}_Vocals.wav")
-    transcription_file = os.path.join(project_dir, f"{base_name}_transcription.json")
-    whisper_output_dir = os.path.join(project_dir, "whisper_output")
-
-    # Check if all target files exist already
-    if (
-        os.path.exists(instrumental_path)
-        and os.path.exists(vocals_path)
-        and os.path.exists(transcription_file)
-        and not args.skip_separation
-    ):
-        print("All target files found. Loading directly...")
-        transcription = Transcription().load_from_file(transcription_file)
-        if not transcription:
-            print(f"Error loading transcription from {transcription_file}")
-            return 1
-    else:
-        # Convert input to WAV
-        audio_processor = AudioProcessor(args.vocal_remover_path)
-        if not audio_processor.convert_to_wav(args.input_file, wav_path):
-            print("Error converting input file to WAV format")
-            return 1
-
-        instrumental_path = wav_path
-        vocals_path = None
-
-        # Separate vocals if requested
-        if not args.skip_separation:
-            if not args.vocal_remover_path:
-                print("Warning: vocal-remover path not specified, skipping separation")
-            else:
-                instrumental_path, vocals_path = audio_processor.separate_vocals(wav_path, project_dir)
-                if not instrumental_path:
-                    print("Warning: Vocal separation failed, using original audio")
-                    instrumental_path = wav_path
+    exit_code = 0
+    input_files = []
+    for input_file in args.input_files:
+        # Check if input file exists, a single stat also rejects directories
+        try:
+            input_stat = os.stat(input_file)
+        except OSError:
+            input_stat = None
+        if input_stat is None or not stat.S_ISREG(input_stat.st_mode):
+            print(f"Error: Input file not found: {input_file}")
+            exit_code = 1
+            continue
+        input_files.append((input_file, input_stat.st_size))
 
-        # Process transcription
-        if not args.skip_transcription:
-            # Check if whisper_output_dir exists and no valid transcription is found,
-            # if so, delete it to ensure a fresh transcription
-            if os.path.exists(whisper_output_dir) and not os.path.exists(transcription_file):
-                print(f"Removing old whisper output directory: {whisper_output_dir}")
-                try:
-                    import shutil
+    try:
+        # Each song gets its own temporary directory, so songs with the same name do not collide
+        song_temp_dirs = [os.path.join(temp_dir, str(index)) for index in range(len(input_files))]
+        for song_temp_dir in song_temp_dirs:
+            os.makedirs(song_temp_dir)
 
-                    shutil.rmtree(whisper_output_dir)
-                except Exception as e:
-                    print(f"Warning: Failed to remove old whisper output directory: {e}")
-
-            transcription_processor = TranscriptionProcessor(
-                DEFAULT_WHISPER_SH_PATH,
-                args.whisper_model,
-                whisper_cpp_path=whisper_cpp_path,
-            )
-            transcription_audio = vocals_path if vocals_path else wav_path
-            print(f"Using audio for transcription: {transcription_audio}")
-
-            # Pass the whisper_output_dir to ensure output is saved in the project folder
-            transcription = transcription_processor.transcribe(
-                transcription_audio, args.language, output_dir=whisper_output_dir
-            )
-
-            if transcription:
-                transcription.save_to_file(transcription_file)
-            else:
-                print("Error: Transcription failed")
-                return 1
-        else:
-            # Try to load existing transcription
-            if os.path.exists(transcription_file):
-                transcription = Transcription().load_from_file(transcription_file)
-                if not transcription:
-                    print(f"Error loading transcription from {transcription_file}")
-                    return 1
-            else:
-                print(f"Error: No transcription file found at {transcription_file} and --skip-transcription specified")
-                return 1
+        # Convert the next song in the background while the current one is separated and played,
+        # unless its stems were already separated
+        with ThreadPoolExecutor(max_workers=1) as converter:
+            next_conversion = None
+            for index, (input_file, input_size) in enumerate(input_files):
+                conversion = next_conversion
+                next_conversion = None
+                if index + 1 < len(input_files):
+                    next_file = input_files[index + 1][0]
+                    next_base_name = os.path.splitext(os.path.basename(next_file))[0]
+                    next_conversion = converter.submit(
+                        prefetch_wav,
+                        next_file,
+                        os.path.join(song_temp_dirs[index + 1], f"{next_base_name}.wav"),
+                        args,
+                        context,
+                    )
 
-    # Start karaoke player
-    player = KaraokePlayer()
-    player.load_audio(instrumental_path, vocals_path)
-    player.load_transcription(transcription)
-    player.play()
-    player.quit()
+                print(f"Processing {input_file} ({input_size / (1024 * 1024):.1f} MB)")
+                result = process_song(input_file, args, context, song_temp_dirs[index], conversion)
+                # Release the GPU memory cached during separation before playing and moving on to the next song
+                context.audio_processor.release_memory()
+                if result is None:
+                    exit_code = 1
+                    continue
+                instrumental_path, vocals_path, transcription = result
 
-    # Clean up temporary directory
-    cleanup_temp_dir(temp_dir)
+                # Start karaoke player
+                player = KaraokePlayer()
+                player.load_audio(instrumental_path, vocals_path)
+                player.load_transcription(transcription)
+                quit_requested = player.play()
+                player.quit()
+                if quit_requested:
+                    # Do not open a window for the next song, the user wants to stop the whole run
+                    if next_conversion is not None:
+                        next_conversion.cancel()
+                    print("Playback quit, skipping the remaining songs")
+                    break
+    finally:
+        # Clean up temporary directory
+        cleanup_temp_dir(temp_dir)
 
-    return 0
+    return exit_code
 
 
 if __name__ == "__main__":
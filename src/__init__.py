@@ -0,0 +1 @@
+"""Songs to Karaoke processing and playback modules."""
@@ -1,52 +1,245 @@
 #!/usr/bin/env python3
 """Audio processing module for handling audio conversion and vocal separation."""
 
+import importlib.util
 import os
-import shutil
 import subprocess
+import tempfile
+import wave
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 
 import ffmpeg
 
+try:
+    from .utils import move_file
+except ImportError:  # Imported as a top-level module, as the tests do
+    from utils import move_file
+
+try:
+    import av
+except ImportError:  # Optional dependency, fall back to the ffmpeg command line
+    av = None
+
+# Optional dependency, fall back to the vocal-remover script. Demucs pulls in PyTorch, which takes
+# seconds to import, so it is only imported by _import_demucs once vocals are actually separated
+DEMUCS_AVAILABLE = importlib.util.find_spec("demucs") is not None
+torch = None
+torchaudio = None
+apply_model = None
+save_audio = None
+get_model = None
+
+# Default Demucs model, the hybrid transformer model has the best vocal separation
+DEFAULT_SEPARATION_MODEL = "htdemucs"
+
+
+def _import_demucs() -> None:
+    """Import Demucs and PyTorch on first use."""
+    global torch, torchaudio, apply_model, save_audio, get_model
+    if apply_model is not None:
+        return
+    import torch
+    import torchaudio
+    from demucs.apply import apply_model
+    from demucs.audio import save_audio
+    from demucs.pretrained import get_model
+
+
+class VocalSeparator:
+    """Class to separate vocals in-process with Demucs, keeping the model loaded between songs."""
+
+    # Loaded models, keyed by model name, shared across instances
+    _models: Dict[str, Any] = {}
+
+    def __init__(self, model_name: str = DEFAULT_SEPARATION_MODEL) -> None:
+        """Initialize the vocal separator.
+
+        Args:
+            model_name: Name of the pretrained Demucs model to use
+        """
+        _import_demucs()
+        self.model_name = model_name
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    def _load_model(self) -> Any:
+        """Load the Demucs model once and reuse it for later separations.
+
+        Uses FP16 weights on CUDA and INT8 dynamic quantization on CPU.
+
+        Returns:
+            The loaded Demucs model
+        """
+        model = VocalSeparator._models.get(self.model_name)
+        if model is None:
+            print(f"Loading separation model: {self.model_name} ({self.device})")
+            model = get_model(self.model_name).eval()
+            if self.device == "cuda":
+                model = model.half()
+            else:
+                # Dynamic quantization only supports linear layers, the convolutions stay FP32
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            model.to(self.device)
+            VocalSeparator._models[self.model_name] = model
+        return model
+
+    def separate(self, input_file: str, instrumental_path: str, vocals_path: str) -> bool:
+        """Separate vocals from instruments and save both as 24-bit WAV files.
+
+        Args:
+            input_file: Path to the input WAV file
+            instrumental_path: Path where the instrumental track should be saved
+            vocals_path: Path where the vocals track should be saved
+
+        Returns:
+            bool: True if separation was successful, False otherwise
+        """
+        try:
+            model = self._load_model()
+            wav, sample_rate = torchaudio.load(input_file)
+            if sample_rate != model.samplerate:
+                wav = torchaudio.functional.resample(wav, sample_rate, model.samplerate)
+
+            # Normalize like the demucs command line does, and undo it on the separated sources
+            reference = wav.mean(0)
+            mean, std = reference.mean(), reference.std()
+            mix = ((wav - mean) / std)[None]
+            if self.device == "cuda":
+                mix = mix.half()  # Match the FP16 weights
+            with torch.inference_mode():
+                sources = apply_model(model, mix, device=self.device, progress=False)[0]
+            sources = sources.float() * std + mean
+
+            vocals = sources[model.sources.index("vocals")]
+            instrumental = sources.sum(0) - vocals
+            save_audio(instrumental.cpu(), instrumental_path, model.samplerate, bits_per_sample=24)
+            save_audio(vocals.cpu(), vocals_path, model.samplerate, bits_per_sample=24)
+            return True
+        except Exception as e:
+            print(f"Error in in-process vocal separation: {e}")
+            return False
+
 
 class AudioProcessor:
-    """Class to handle audio processing, conversion and vocal separation."""
+    """Class to handle audio processing, conversion and vocal separation.
+
+    Separates vocals in-process with Demucs when it is installed, otherwise
+    falls back to the vocal-remover inference script.
+    """
 
-    def __init__(self, vocal_remover_path: str):
+    def __init__(self, vocal_remover_path: str, use_script: bool = False):
         """Initialize the audio processor with path to vocal remover.
 
         Args:
             vocal_remover_path: Path to the vocal-remover directory
+            use_script: Force the vocal-remover script even if Demucs is available
         """
         self.vocal_remover_path = vocal_remover_path
+        self.inference_script = os.path.join(vocal_remover_path, "inference.py") if vocal_remover_path else None
+        self.use_script = use_script or not DEMUCS_AVAILABLE
+
+    def get_separator_name(self) -> str:
+        """Get the name of the backend used to separate vocals, as stems from different backends differ.
+
+        Returns:
+            The Demucs model name, or vocal-remover when the script is used
+        """
+        return "vocal-remover" if self.use_script else DEFAULT_SEPARATION_MODEL
 
-    def convert_to_wav(self, input_file: str, output_file: str) -> bool:
+    def release_memory(self) -> None:
+        """Release GPU memory cached by PyTorch during separation, the loaded model itself is kept."""
+        # PyTorch is only imported once vocals have been separated in-process
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def _prefetch(self, file_path: str) -> None:
+        """Ask the kernel to start reading a file into the page cache before it is read sequentially.
+
+        Args:
+            file_path: Path to the file that is about to be read
+        """
+        if not hasattr(os, "posix_fadvise"):  # Not available on macOS and Windows
+            return
+        try:
+            fd = os.open(file_path, os.O_RDONLY)
+            try:
+                # WILLNEED readahead fills the shared page cache, so it also benefits the
+                # decoder or subprocess that opens the file next
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+    def is_pcm_wav(self, input_file: str, for_asr: bool = False) -> bool:
+        """Check if a file is already a 16-bit PCM WAV that can be processed without conversion.
+
+        Args:
+            input_file: Path to the input audio file
+            for_asr: Only accept 16 kHz mono, the format convert_to_wav writes for whisper
+
+        Returns:
+            bool: True if the file is a stereo 16-bit PCM WAV of at least 16 kHz
+        """
+        if not input_file.lower().endswith(".wav"):
+            return False
+        try:
+            # Only reads the header, wave rejects anything that is not plain PCM
+            with wave.open(input_file, "rb") as wav_file:
+                if for_asr:
+                    return (
+                        wav_file.getsampwidth() == 2
+                        and wav_file.getframerate() == 16000
+                        and wav_file.getnchannels() == 1
+                    )
+                # Mono is converted too, the separation models only take stereo input
+                return (
+                    wav_file.getsampwidth() == 2 and wav_file.getframerate() >= 16000 and wav_file.getnchannels() == 2
+                )
+        except (wave.Error, EOFError, OSError):
+            return False
+
+    def convert_to_wav(self, input_file: str, output_file: str, for_asr: bool = False) -> bool:
         """Convert input file to WAV format suitable for processing while preserving quality.
 
         Args:
             input_file: Path to the input audio file
             output_file: Path where the output WAV file should be saved
+            for_asr: Write 16 kHz mono 16-bit PCM, the format whisper works on, instead of CD quality
 
         Returns:
             bool: True if conversion was successful, False otherwise
         """
-        try:
+        self._prefetch(input_file)
+
+        if for_asr:
+            # Whisper resamples everything to 16 kHz mono, so anything more is wasted bandwidth
+            sample_rate, channels, layout, codec = 16000, 1, "mono", "pcm_s16le"
+        else:
             # Use higher quality settings for better audio fidelity
-            high_quality_sample_rate = 44100  # CD quality
+            sample_rate, channels, layout, codec = 44100, 2, "stereo", "pcm_s24le"
 
+        if av is not None:
+            try:
+                self._convert_with_av(input_file, output_file, sample_rate, layout, codec)
+                print(f"Converted to WAV: {output_file}")
+                return True
+            except Exception as e:
+                print(f"Error in in-process conversion, falling back to ffmpeg: {e}")
+
+        try:
             (
                 ffmpeg.input(input_file)
                 .output(
                     output_file,
-                    ar=high_quality_sample_rate,  # CD quality sample rate
-                    ac=2,  # Stereo
-                    acodec="pcm_s24le",  # 24-bit PCM for better dynamic range
+                    ar=sample_rate,  # CD quality sample rate, or 16 kHz for ASR
+                    ac=channels,  # Stereo, or mono for ASR
+                    acodec=codec,  # 24-bit PCM for better dynamic range, or 16-bit for ASR
                     format="wav",
                 )
                 .run(quiet=True, overwrite_output=True)
             )
-            print(f"Converted to high-quality WAV: {output_file}")
+            print(f"Converted to WAV: {output_file}")
             return True
         except Exception as e:
             print(f"Error in high-quality conversion: {e}")
@@ -55,7 +248,7 @@ class AudioProcessor:
                 print("Falling back to standard quality conversion...")
                 (
                     ffmpeg.input(input_file)
-                    .output(output_file, ar=16000, ac=2, format="wav")
+                    .output(output_file, ar=16000, ac=channels, format="wav")
                     .run(quiet=True, overwrite_output=True)
                 )
                 print("Standard conversion successful")
@@ -64,8 +257,30 @@ class AudioProcessor:
                 print(f"Error converting to WAV: {e2}")
                 return False
 
+    def _convert_with_av(self, input_file: str, output_file: str, sample_rate: int, layout: str, codec: str) -> None:
+        """Decode and resample the first audio stream in-process with PyAV, without spawning ffmpeg.
+
+        Args:
+            input_file: Path to the input audio or video file
+            output_file: Path where the output WAV file should be saved
+            sample_rate: Output sample rate in Hz
+            layout: Output channel layout, e.g. stereo or mono
+            codec: Output PCM codec, e.g. pcm_s24le
+        """
+        with av.open(input_file) as container, av.open(output_file, "w", format="wav") as output:
+            stream = output.add_stream(codec, rate=sample_rate, layout=layout)
+            # Resample straight into the encoder's sample format, e.g. s32 for 24-bit PCM
+            resampler = av.AudioResampler(format=stream.codec_context.format.name, layout=layout, rate=sample_rate)
+            for frame in container.decode(audio=0):
+                for resampled in resampler.resample(frame):
+                    output.mux(stream.encode(resampled))
+            # Flush the samples buffered in the resampler and the encoder
+            for resampled in resampler.resample(None):
+                output.mux(stream.encode(resampled))
+            output.mux(stream.encode(None))
+
     def separate_vocals(self, input_file: str, output_dir: str) -> Tuple[Optional[str], Optional[str]]:
-        """Use vocal-remover to separate vocals from instruments.
+        """Use Demucs or vocal-remover to separate vocals from instruments.
 
         Args:
             input_file: Path to the input WAV file
@@ -84,30 +299,43 @@ class AudioProcessor:
                 print(f"Separated files already exist: {instrumental_path} and {vocals_path}")
                 return instrumental_path, vocals_path
 
+            self._prefetch(input_file)
+
+            if not self.use_script:
+                print(f"Separating vocals from instruments: {input_file}")
+                if VocalSeparator().separate(input_file, instrumental_path, vocals_path):
+                    return instrumental_path, vocals_path
+                return None, None
+
             # Run vocal-remover
             cmd = [
                 "python",
-                os.path.join(self.vocal_remover_path, "inference.py"),
+                self.inference_script,
                 "--input",
                 input_file,
+                "--output_dir",
+                # Write the stems straight into the project, the script runs in its own cwd
+                os.path.abspath(output_dir),
                 "--tta",
                 "--gpu",
                 "0",
             ]
 
             print(f"Separating vocals from instruments: {input_file}")
-            process = subprocess.Popen(
-                cmd,
-                cwd=self.vocal_remover_path,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,  # Use text mode for better Python 3 compatibility
-            )
-            stdout, stderr = process.communicate()
-
-            if process.returncode != 0:
-                print(f"Error separating vocals: {stderr}")
-                return None, None
+            # Spool stderr to a file instead of draining pipes, it is only read if the script fails
+            with tempfile.TemporaryFile() as stderr_file:
+                process = subprocess.run(
+                    cmd,
+                    cwd=self.vocal_remover_path,
+                    stdout=subprocess.DEVNULL,
+                    stderr=stderr_file,
+                    check=False,
+                )
+                if process.returncode != 0:
+                    stderr_file.seek(0)
+                    stderr = stderr_file.read().decode(errors="replace")
+                    print(f"Error separating vocals: {stderr}")
+                    return None, None
 
             # Verify files were created
             if not (os.path.exists(instrumental_path) and os.path.exists(vocals_path)):
@@ -125,8 +353,8 @@ class AudioProcessor:
 
                     if os.path.exists(instr_path) and os.path.exists(voc_path):
                         # Found the files, move them to the output directory
-                        shutil.move(instr_path, instrumental_path)
-                        shutil.move(voc_path, vocals_path)
+                        move_file(instr_path, instrumental_path)
+                        move_file(voc_path, vocals_path)
                         print(f"Found and moved separated files to {output_dir}")
                         return instrumental_path, vocals_path
 
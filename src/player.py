@@ -4,19 +4,59 @@
 import os
 import sys
 import time
-from typing import Any, List, Optional
+import wave
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
 # Set environment variable to hide pygame welcome message
 os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
 
 import pygame  # noqa: E402
 
+try:
+    import av
+except ImportError:  # Optional dependency, fall back to reading plain PCM WAV headers
+    av = None
+
+
+def get_audio_format(audio_path: str) -> Optional[Tuple[int, int]]:
+    """Read the sample rate and channel count of an audio file.
+
+    PyAV reads any format, including the 24-bit WAVE_FORMAT_EXTENSIBLE stems written by the separation,
+    the wave module only reads plain PCM WAV files.
+
+    Args:
+        audio_path: Path to the audio file
+
+    Returns:
+        Tuple of (sample_rate, channels), or None if the file cannot be read
+    """
+    try:
+        if av is not None:
+            with av.open(audio_path) as container:
+                codec_context = container.streams.audio[0].codec_context
+                return codec_context.sample_rate, codec_context.channels
+        with wave.open(audio_path, "rb") as wav_file:
+            return wav_file.getframerate(), wav_file.getnchannels()
+    except Exception:
+        return None
+
 
 class KaraokePlayer:
     """Class to play audio with synchronized lyrics."""
 
-    def __init__(self) -> None:
-        """Initialize the karaoke player with UI and audio components."""
+    # Font file found by the first player, shared across instances, None for pygame's default font
+    _font_path: Optional[str] = None
+    _font_path_found = False
+
+    def __init__(self, audio_buffer: int = 1024) -> None:
+        """Initialize the karaoke player with UI and audio components.
+
+        Args:
+            audio_buffer: Mixer buffer size in samples, smaller values lower latency but may crackle
+        """
+        # Applies to every mixer initialization, including the one pygame.init() does
+        pygame.mixer.pre_init(buffer=audio_buffer)
         pygame.init()
         pygame.mixer.init()
         pygame.mixer.set_num_channels(8)  # Set more channels for flexibility
@@ -30,8 +70,7 @@ class KaraokePlayer:
         self.text_margin = 80  # Horizontal margin for text (40px on each side)
         self.max_text_width = self.WIDTH - self.text_margin
 
-        # Font setup
-        pygame.font.init()
+        # Font setup, the font module was already initialized by pygame.init()
         self._setup_fonts()
 
         # Colors
@@ -43,8 +82,42 @@ class KaraokePlayer:
         self.GRAY = (150, 150, 150)
         self.YELLOW = (255, 255, 0)
 
+        # Static UI elements, built once instead of on every frame
+        # Converted to the display's pixel format, so blitting it does not convert every pixel
+        self.background = pygame.Surface((self.WIDTH, self.HEIGHT)).convert()
+        self.background.fill(self.BLACK)
+        # Draw translucent overlay at the top for info display
+        top_overlay = pygame.Surface((self.WIDTH, 70), pygame.SRCALPHA)
+        top_overlay.fill((20, 20, 30, 180))  # Dark blue with alpha
+        self.background.blit(top_overlay, (0, 0))
+        # Draw progress bar background
+        progress_bg_rect = pygame.Rect(20, 50, self.WIDTH - 40, 10)
+        pygame.draw.rect(self.background, (60, 60, 70), progress_bg_rect, border_radius=5)
+        # Screen regions, the top bar changes every frame while the lyrics only change between segments
+        self.top_rect = pygame.Rect(0, 0, self.WIDTH, 70)
+        self.lyrics_rect = pygame.Rect(0, 70, self.WIDTH, self.HEIGHT - 70)
+        # The bottom overlay and controls are drawn over the lyrics, so they stay separate
+        self.bottom_overlay = pygame.Surface((self.WIDTH, 40), pygame.SRCALPHA)
+        self.bottom_overlay.fill((20, 20, 30, 180))  # Dark blue with alpha
+        self.bottom_overlay = self.bottom_overlay.convert_alpha()
+        controls_text = "[SPACE] Pause/Play  •  [V] Toggle Vocals  •  [ESC] Quit"
+        self.controls_surface = self.small_font.render(controls_text, True, self.WHITE)
+        self.controls_rect = self.controls_surface.get_rect(center=(self.WIDTH / 2, self.HEIGHT - 20))
+
+        # Status labels only have two states each, so render both up front
+        self.vocals_labels = {}
+        self.play_labels = {}
+        for enabled in (True, False):
+            color = self.WHITE if enabled else self.GRAY
+            vocals_surface = self.small_font.render(f"Vocals: {'ON' if enabled else 'OFF'}", True, color)
+            self.vocals_labels[enabled] = (vocals_surface, vocals_surface.get_rect(topleft=(20, 15)))
+            play_surface = self.small_font.render(f"Status: {'Playing' if enabled else 'Paused'}", True, color)
+            self.play_labels[enabled] = (play_surface, play_surface.get_rect(topright=(self.WIDTH - 20, 15)))
+
         # Playback state
         self.playing = False
+        self.running = False  # Whether the main display loop is running
+        self.quit_requested = False  # Whether the user asked to quit rather than let the song end
         self.current_position = 0.0
         self.total_duration = 0.0  # Track total duration of the song
         self.vocals_enabled = False
@@ -55,6 +128,38 @@ class KaraokePlayer:
         self.instrumental_channel: Optional[pygame.mixer.Channel] = None
         self.vocals_channel: Optional[pygame.mixer.Channel] = None
 
+        # Rendered text surfaces, keyed by (font id, text, color), so unchanged lines are not rasterized again.
+        # Least recently used entries are dropped first once the cache is full.
+        self.text_cache: OrderedDict[Tuple[int, str, Tuple[int, ...]], pygame.Surface] = OrderedDict()
+        self.text_cache_size = 256
+
+        # Highlight drawn behind the active lyric, recreated only when its size changes
+        self.highlight_surface: Optional[pygame.Surface] = None
+
+        # Wrapped lines of each lyric, keyed by (font id, text), since the text width never changes
+        self.wrap_cache: Dict[Tuple[int, str], List[str]] = {}
+
+        # Time display for the last rendered (position, duration) in whole seconds
+        self.time_key: Optional[Tuple[int, int]] = None
+        self.time_surface: Optional[pygame.Surface] = None
+        self.time_rect: Optional[pygame.Rect] = None
+
+        # Progress, time and status shown in the top bar on the last frame, None forces a redraw
+        self.top_key: Optional[Tuple[Optional[int], Tuple[int, int], bool, bool]] = None
+
+        # Segments shown in the lyrics area on the last frame, None forces a redraw
+        self.lyrics_segments: Optional[List[Dict[str, Any]]] = None
+
+        # Actions bound to keys, looked up once per key press
+        self.key_handlers = {
+            pygame.K_SPACE: self.toggle_pause,
+            pygame.K_v: self.toggle_vocals,
+            pygame.K_ESCAPE: self.request_quit,
+        }
+
+        # Frame clock, created once so it can keep track of the time between frames
+        self.clock = pygame.time.Clock()
+
         # Variables to handle pause/resume timing
         self.start_time = 0.0
         self.pause_time = 0.0
@@ -67,55 +172,17 @@ class KaraokePlayer:
         both Latin and CJK characters.
         """
         try:
-            default_font = None
-            # Use a well-supported CJK font directly based on the platform
-            if sys.platform == "darwin":  # macOS
-                # Try multiple macOS fonts with good Unicode coverage in this order
-                fonts = [
-                    "Hiragino Sans GB",
-                    "PingFang SC",
-                    "STHeiti",
-                    "AppleGothic",
-                    "Osaka",
-                ]
-            elif sys.platform == "win32":  # Windows typically has these fonts
-                fonts = [
-                    "Microsoft JhengHei",
-                    "Microsoft YaHei",
-                    "Yu Gothic UI",
-                    "Meiryo",
-                    "Malgun Gothic",
-                ]
-            # Linux and others, try a common font
-            else:
-                fonts = [
-                    "Noto Sans CJK TC",
-                    "Noto Sans CJK SC",
-                    "WenQuanYi Zen Hei",
-                    "Noto Sans CJK JP",
-                    "Noto Sans CJK KR",
-                ]
-
-            # Try each font until we find one that works
-            for font in fonts:
-                try:
-                    test_font = pygame.font.SysFont(font, 32)
-                    # Test render with some challenging unicode characters
-                    test = test_font.render("測試 测试 テスト 한글", True, (255, 255, 255))
-                    if test and test.get_width() > 10:  # Valid render check
-                        default_font = font
-                        break
-                except Exception:
-                    continue
-
-            if not default_font:  # If none of the specific fonts worked, try the system default
-                default_font = pygame.font.get_default_font()
+            # Look the font file up once, the players created for the following songs reuse it
+            if not KaraokePlayer._font_path_found:
+                KaraokePlayer._font_path = self._find_font_path()
+                KaraokePlayer._font_path_found = True
+            font_path = KaraokePlayer._font_path
 
             # Create fonts with direct CJK support
-            self.font_large = pygame.font.SysFont(default_font, 36)  # Larger font for active lyric
-            self.font = pygame.font.SysFont(default_font, 32)
-            self.small_font = pygame.font.SysFont(default_font, 24)
-            print(f"Using font: {default_font}")
+            self.font_large = pygame.font.Font(font_path, 36)  # Larger font for active lyric
+            self.font = pygame.font.Font(font_path, 32)
+            self.small_font = pygame.font.Font(font_path, 24)
+            print(f"Using font: {font_path or pygame.font.get_default_font()}")
 
             # Verify the font can render CJK characters
             test = self.font.render("测试 テスト 한글", True, (255, 255, 255))
@@ -138,6 +205,57 @@ class KaraokePlayer:
                 self.font = pygame.font.SysFont("Arial", 32)
                 self.small_font = pygame.font.SysFont("Arial", 24)
 
+    def _find_font_path(self) -> Optional[str]:
+        """Find the file of a font for the current platform that renders CJK characters.
+
+        Returns:
+            Path to the first working CJK font, or None to use pygame's default font
+        """
+        # Use a well-supported CJK font directly based on the platform
+        if sys.platform == "darwin":  # macOS
+            # Try multiple macOS fonts with good Unicode coverage in this order
+            fonts = [
+                "Hiragino Sans GB",
+                "PingFang SC",
+                "STHeiti",
+                "AppleGothic",
+                "Osaka",
+            ]
+        elif sys.platform == "win32":  # Windows typically has these fonts
+            fonts = [
+                "Microsoft JhengHei",
+                "Microsoft YaHei",
+                "Yu Gothic UI",
+                "Meiryo",
+                "Malgun Gothic",
+            ]
+        # Linux and others, try a common font
+        else:
+            fonts = [
+                "Noto Sans CJK TC",
+                "Noto Sans CJK SC",
+                "WenQuanYi Zen Hei",
+                "Noto Sans CJK JP",
+                "Noto Sans CJK KR",
+            ]
+
+        # Try each font until we find one that works
+        for font in fonts:
+            try:
+                font_path = pygame.font.match_font(font)
+                if not font_path:  # Not installed
+                    continue
+                test_font = pygame.font.Font(font_path, 32)
+                # Test render with some challenging unicode characters
+                test = test_font.render("測試 测试 テスト 한글", True, (255, 255, 255))
+                if test and test.get_width() > 10:  # Valid render check
+                    return font_path
+            except Exception:
+                continue
+
+        # If none of the specific fonts worked, use the default font like SysFont does
+        return None
+
     def load_audio(self, instrumental_path: str, vocals_path: Optional[str] = None) -> bool:
         """Load audio files for playback.
 
@@ -150,6 +268,7 @@ class KaraokePlayer:
         """
         try:
             print(f"Loading instrumental audio: {instrumental_path}")
+            self._match_mixer_format(instrumental_path)
             self.instrumental_sound = pygame.mixer.Sound(instrumental_path)
             # Reserve channel 0 for instrumental
             self.instrumental_channel = pygame.mixer.Channel(0)
@@ -173,6 +292,28 @@ class KaraokePlayer:
             print(f"Error loading audio: {e}")
             return False
 
+    def _match_mixer_format(self, audio_path: str) -> None:
+        """Reinitialize the mixer at the sample rate and channel count of an audio file.
+
+        Sounds are converted to the mixer's format when loaded, so a mismatched mixer would resample the tracks.
+        Files whose format cannot be read leave the mixer as it is.
+
+        Args:
+            audio_path: Path to the audio file that will be played
+        """
+        audio_format = get_audio_format(audio_path)
+        if audio_format is None:
+            return
+        frequency, channels = audio_format
+
+        mixer_format = pygame.mixer.get_init()
+        if mixer_format and (mixer_format[0], mixer_format[2]) == (frequency, channels):
+            return
+
+        pygame.mixer.quit()
+        pygame.mixer.init(frequency=frequency, channels=channels)
+        pygame.mixer.set_num_channels(8)
+
     def load_transcription(self, transcription: Any) -> None:
         """Load transcription for display.
 
@@ -180,6 +321,12 @@ class KaraokePlayer:
             transcription: Transcription object containing timing and lyrics
         """
         self.transcription = transcription
+        self.wrap_cache.clear()
+
+        # Every lyric is known up front, so wrap them all now instead of while the song is playing
+        for segment in transcription.segments:
+            self._wrapped_lines(segment["text"], self.font)
+            self._wrapped_lines(segment["text"], self.font_large)
 
     def toggle_vocals(self) -> None:
         """Toggle vocals on/off by changing volume."""
@@ -193,18 +340,43 @@ class KaraokePlayer:
                 self.vocals_channel.set_volume(0.0)
                 print("Vocals disabled")
 
-    def play(self) -> None:
-        """Start playback and run the main display loop."""
+    def toggle_pause(self) -> None:
+        """Toggle between paused and playing, keeping track of the time spent paused."""
+        if self.playing:
+            # Store pause time when pausing
+            self.pause_time = time.perf_counter()
+            pygame.mixer.pause()
+        else:
+            # Calculate accumulated pause time when resuming
+            pause_duration = time.perf_counter() - self.pause_time
+            self.accumulated_pause_time += pause_duration
+            pygame.mixer.unpause()
+        self.playing = not self.playing
+
+    def request_quit(self) -> None:
+        """Stop playback and leave the main display loop, telling the caller the user wants to quit."""
+        self.quit_requested = True
+        self.running = False
+
+    def play(self) -> bool:
+        """Start playback and run the main display loop.
+
+        Returns:
+            True if the user quit with ESC or by closing the window, False if the song played to the end
+        """
         if not self.instrumental_sound:
             print("No audio loaded")
-            return
+            return False
 
         self.playing = True
+        self.quit_requested = False
 
         # Reset timing variables
-        self.start_time = time.time()
+        self.start_time = time.perf_counter()
         self.accumulated_pause_time = 0.0
         self.current_position = 0.0
+        self.top_key = None
+        self.lyrics_segments = None
 
         # Play instrumental on channel 0
         if self.instrumental_channel:
@@ -216,131 +388,145 @@ class KaraokePlayer:
             # Set initial volume based on vocals_enabled state
             self.vocals_channel.set_volume(1.0 if self.vocals_enabled else 0.0)
 
+        # Only queue the events the loop handles, mouse motion and other window events are dropped by SDL
+        # instead of waking the paused loop or being fetched and skipped on every frame
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed([pygame.QUIT, pygame.KEYDOWN, pygame.VIDEOEXPOSE])
+
         # Main playback loop
-        running = True
-        while running:
-            for event in pygame.event.get():
+        self.running = True
+        while self.running:
+            if self.playing:
+                events = pygame.event.get()
+            else:
+                # Nothing moves while paused, so sleep until the next event instead of redrawing every frame
+                events = [pygame.event.wait(1000)]
+                events.extend(pygame.event.get())
+                if all(event.type == pygame.NOEVENT for event in events):
+                    # Timed out without any input, the paused screen is still up to date
+                    continue
+
+            for event in events:
                 if event.type == pygame.QUIT:
-                    running = False
+                    self.request_quit()
+                elif event.type == pygame.VIDEOEXPOSE:
+                    # The window was uncovered, repaint all of it instead of only what changed
+                    self.top_key = None
+                    self.lyrics_segments = None
                 elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_SPACE:
-                        # Toggle pause/play
-                        if self.playing:
-                            # Store pause time when pausing
-                            self.pause_time = time.time()
-                            pygame.mixer.pause()
-                        else:
-                            # Calculate accumulated pause time when resuming
-                            pause_duration = time.time() - self.pause_time
-                            self.accumulated_pause_time += pause_duration
-                            pygame.mixer.unpause()
-                        self.playing = not self.playing
-                    elif event.key == pygame.K_v:
-                        # Toggle vocals
-                        self.toggle_vocals()
-                    elif event.key == pygame.K_ESCAPE:
-                        running = False
+                    handler = self.key_handlers.get(event.key)
+                    if handler:
+                        handler()
 
             # Update current position if playing
             if self.playing:
                 # Calculate current position considering accumulated pause time
-                self.current_position = time.time() - self.start_time - self.accumulated_pause_time
+                self.current_position = time.perf_counter() - self.start_time - self.accumulated_pause_time
 
-                # Check if playback is still active
-                if pygame.mixer.get_busy():
+                # Check if playback is still active, the instrumental track spans the whole song
+                if self.instrumental_channel is not None and self.instrumental_channel.get_busy():
                     if self.current_position > self.total_duration:
                         # We've reached the end of the track
                         self.current_position = self.total_duration
-                        running = False
+                        self.running = False
                 elif self.playing:
                     # If mixer is not busy but we think we're playing, playback has ended
-                    running = False
+                    self.running = False
 
                 # Ensure current position doesn't exceed total duration
                 if self.current_position > self.total_duration:
                     self.current_position = self.total_duration
 
-            self._render_ui()
-            pygame.display.flip()
-            pygame.time.wait(50)  # ~20 FPS
+            # Only push the regions that were redrawn to the display, if any
+            dirty_rects = self._render_ui()
+            if dirty_rects:
+                pygame.display.update(dirty_rects)
+            self.clock.tick(20)  # ~20 FPS, accounting for the time spent rendering
 
-            # Check if playback has finished
-            if (not pygame.mixer.get_busy() and self.playing) or (self.current_position >= self.total_duration):
-                running = False
+            # Check if playback has finished, an idle mixer was already handled above
+            if self.current_position >= self.total_duration:
+                self.running = False
 
         pygame.mixer.stop()
         self.playing = False
+        return self.quit_requested
 
-    def _render_ui(self) -> None:
-        """Render the player UI including lyrics and controls."""
-        # Clear screen with a gradient background
-        self.screen.fill(self.BLACK)
-
-        # Draw translucent overlay at the top for info display
-        overlay_rect = pygame.Rect(0, 0, self.WIDTH, 70)
-        overlay_surface = pygame.Surface((self.WIDTH, 70), pygame.SRCALPHA)
-        overlay_surface.fill((20, 20, 30, 180))  # Dark blue with alpha
-        self.screen.blit(overlay_surface, overlay_rect)
+    def _render_ui(self) -> List[pygame.Rect]:
+        """Render the parts of the player UI that changed since the last frame.
 
-        # Draw progress bar background
-        progress_bg_rect = pygame.Rect(20, 50, self.WIDTH - 40, 10)
-        pygame.draw.rect(self.screen, (60, 60, 70), progress_bg_rect, border_radius=5)
+        Returns:
+            List of screen regions that were redrawn
+        """
+        dirty_rects = []
 
-        # Calculate and draw progress bar fill
+        # Redraw the top bar only when the progress bar grew by a pixel, the time or a status changed
+        progress_width = None
         if self.total_duration > 0:
             progress_width = int((self.current_position / self.total_duration) * (self.WIDTH - 40))
-            progress_rect = pygame.Rect(20, 50, progress_width, 10)
-            progress_color = (100, 170, 255) if self.playing else (150, 150, 150)
-            pygame.draw.rect(self.screen, progress_color, progress_rect, border_radius=5)
-
-        # Format and draw time display (current/total)
-        current_mins, current_secs = divmod(int(self.current_position), 60)
-        total_mins, total_secs = divmod(int(self.total_duration), 60)
-
-        time_text = f"{current_mins:02d}:{current_secs:02d} / {total_mins:02d}:{total_secs:02d}"
-        time_surface = self.font.render(time_text, True, self.WHITE)
-        time_rect = time_surface.get_rect(midtop=(self.WIDTH // 2, 10))
-        self.screen.blit(time_surface, time_rect)
-
-        # Draw vocals status with icon
-        vocals_status = "ON" if self.vocals_enabled else "OFF"
-        vocals_color = self.WHITE if self.vocals_enabled else self.GRAY
-        vocals_text = f"Vocals: {vocals_status}"
-        vocals_surface = self.small_font.render(vocals_text, True, vocals_color)
-        vocals_rect = vocals_surface.get_rect(topleft=(20, 15))
-        self.screen.blit(vocals_surface, vocals_rect)
-
-        # Draw play/pause status with icon
-        play_status = "Playing" if self.playing else "Paused"
-        play_color = self.WHITE if self.playing else self.GRAY
-        play_text = f"Status: {play_status}"
-        play_surface = self.small_font.render(play_text, True, play_color)
-        play_rect = play_surface.get_rect(topright=(self.WIDTH - 20, 15))
-        self.screen.blit(play_surface, play_rect)
-
-        # Draw lyrics as a flowing stream
-        self._render_lyrics()
-
-        # Draw translucent overlay at the bottom for controls
-        bottom_overlay_rect = pygame.Rect(0, self.HEIGHT - 40, self.WIDTH, 40)
-        bottom_overlay = pygame.Surface((self.WIDTH, 40), pygame.SRCALPHA)
-        bottom_overlay.fill((20, 20, 30, 180))  # Dark blue with alpha
-        self.screen.blit(bottom_overlay, bottom_overlay_rect)
-
-        # Draw controls help
-        controls_text = "[SPACE] Pause/Play  •  [V] Toggle Vocals  •  [ESC] Quit"
-        controls_surface = self.small_font.render(controls_text, True, self.WHITE)
-        controls_rect = controls_surface.get_rect(center=(self.WIDTH / 2, self.HEIGHT - 20))
-        self.screen.blit(controls_surface, controls_rect)
-
-    def _render_lyrics(self) -> None:
-        """Render the lyrics with current segment highlighted."""
-        if not self.transcription:
-            return
+        time_key = (int(self.current_position), int(self.total_duration))
+        top_key = (progress_width, time_key, self.playing, self.vocals_enabled)
+        if top_key != self.top_key:
+            self.top_key = top_key
+
+            # Clear the top bar with the pre-drawn background, top overlay and progress bar track
+            self.screen.blit(self.background, self.top_rect, self.top_rect)
+            dirty_rects.append(self.top_rect)
+
+            # Calculate and draw progress bar fill
+            if progress_width is not None:
+                progress_rect = pygame.Rect(20, 50, progress_width, 10)
+                progress_color = (100, 170, 255) if self.playing else (150, 150, 150)
+                pygame.draw.rect(self.screen, progress_color, progress_rect, border_radius=5)
+
+            # Format and draw time display (current/total), only when the displayed second changes
+            if time_key != self.time_key:
+                current_mins, current_secs = divmod(time_key[0], 60)
+                total_mins, total_secs = divmod(time_key[1], 60)
+                time_text = f"{current_mins:02d}:{current_secs:02d} / {total_mins:02d}:{total_secs:02d}"
+                # Rendered directly, every second would otherwise take a slot in the text cache
+                self.time_surface = self.font.render(time_text, True, self.WHITE)
+                self.time_rect = self.time_surface.get_rect(midtop=(self.WIDTH // 2, 10))
+                self.time_key = time_key
+
+            # Draw the time with the vocals and play/pause status in a single call
+            self.screen.blits(
+                [
+                    (self.time_surface, self.time_rect),
+                    self.vocals_labels[self.vocals_enabled],
+                    self.play_labels[self.playing],
+                ],
+                doreturn=False,
+            )
 
         # Get segments around current time (2 before, 3 after)
-        segments = self.transcription.get_segments_around_time(self.current_position, 2, 3)
+        segments = []
+        if self.transcription:
+            segments = self.transcription.get_segments_around_time(self.current_position, 2, 3)
+
+        # Redraw the lyrics area only when different segments are shown or another one becomes active
+        # The transcription returns the same window while it is unchanged, so this is usually an identity check
+        if segments != self.lyrics_segments:
+            self.lyrics_segments = segments
+            self.screen.blit(self.background, self.lyrics_rect, self.lyrics_rect)
 
+            # Draw lyrics as a flowing stream
+            self._render_lyrics(segments)
+
+            # Draw translucent overlay at the bottom for controls, with the controls help on top
+            self.screen.blits(
+                [(self.bottom_overlay, (0, self.HEIGHT - 40)), (self.controls_surface, self.controls_rect)],
+                doreturn=False,
+            )
+            dirty_rects.append(self.lyrics_rect)
+
+        return dirty_rects
+
+    def _render_lyrics(self, segments: List[Dict[str, Any]]) -> None:
+        """Render the lyrics with current segment highlighted.
+
+        Args:
+            segments: Segments around the current time, with active status and index
+        """
         if not segments:
             return
 
@@ -361,8 +547,9 @@ class KaraokePlayer:
         else:
             y_start = self.HEIGHT // 2 - ((len(segments) - 1) * line_spacing // 2) + 20
 
-        # Draw each segment
+        # Draw each segment, collecting the blits so they are drawn in a single call
         y_pos = y_start
+        blit_sequence = []
         for segment in segments:
             text = segment["text"]
 
@@ -373,9 +560,11 @@ class KaraokePlayer:
                 # Add highlight effect for active lyrics
                 text_width = font_to_use.size(text)[0]
                 highlight_rect = pygame.Rect((self.WIDTH - text_width) // 2 - 10, y_pos - 10, text_width + 20, 45)
-                highlight_surface = pygame.Surface((highlight_rect.width, highlight_rect.height), pygame.SRCALPHA)
-                highlight_surface.fill((100, 170, 255, 30))  # Light blue with alpha
-                self.screen.blit(highlight_surface, highlight_rect)
+                if self.highlight_surface is None or self.highlight_surface.get_size() != highlight_rect.size:
+                    highlight_surface = pygame.Surface(highlight_rect.size, pygame.SRCALPHA)
+                    highlight_surface.fill((100, 170, 255, 30))  # Light blue with alpha
+                    self.highlight_surface = highlight_surface.convert_alpha()
+                blit_sequence.append((self.highlight_surface, highlight_rect))
             else:
                 font_to_use = self.font
                 # Make segments further away from active more transparent
@@ -389,19 +578,61 @@ class KaraokePlayer:
                 )
 
             # Split text into lines if too long
-            lines = self.wrap_text(text, font_to_use)
+            lines = self._wrapped_lines(text, font_to_use)
 
             # Draw each line with additional spacing between multi-line segments
             inner_line_spacing = 40  # Spacing between lines of the same segment
             for line in lines:
-                text_surface = font_to_use.render(line, True, color)
+                text_surface = self._render_text(font_to_use, line, color)
                 text_rect = text_surface.get_rect(center=(self.WIDTH / 2, y_pos))
-                self.screen.blit(text_surface, text_rect)
+                blit_sequence.append((text_surface, text_rect))
                 y_pos += inner_line_spacing
 
             # Add extra space between segments
             y_pos += line_spacing - inner_line_spacing
 
+        self.screen.blits(blit_sequence, doreturn=False)
+
+    def _render_text(self, font: pygame.font.Font, text: str, color: Tuple[int, ...]) -> pygame.Surface:
+        """Render text, reusing the surface rendered for the same font, text and color.
+
+        Args:
+            font: The pygame font to render with
+            text: The text to render
+            color: The text color
+
+        Returns:
+            The rendered text surface
+        """
+        key = (id(font), text, color)
+        surface = self.text_cache.get(key)
+        if surface is None:
+            if len(self.text_cache) >= self.text_cache_size:
+                # Drop the line that has gone longest without being drawn
+                self.text_cache.popitem(last=False)
+            surface = font.render(text, True, color)
+            self.text_cache[key] = surface
+        else:
+            self.text_cache.move_to_end(key)
+        return surface
+
+    def _wrapped_lines(self, text: str, font: pygame.font.Font) -> List[str]:
+        """Wrap text to fit the screen, reusing the lines computed for the same font and text.
+
+        Args:
+            text: The text to wrap
+            font: The pygame font to use for size calculations
+
+        Returns:
+            List of wrapped text lines, which must not be modified
+        """
+        key = (id(font), text)
+        lines = self.wrap_cache.get(key)
+        if lines is None:
+            lines = self.wrap_text(text, font)
+            self.wrap_cache[key] = lines
+        return lines
+
     def wrap_text(self, text: str, font: pygame.font.Font) -> List[str]:
         """Wrap text to fit within the maximum text width.
 
@@ -417,8 +648,9 @@ class KaraokePlayer:
             List of wrapped text lines
         """
         # For languages without spaces (CJK), we need character-by-character wrapping
-        # Check if the text contains mostly CJK characters
-        if any(ord(c) > 0x3000 for c in text) and len([c for c in text if ord(c) > 0x3000]) > len(text) * 0.5:
+        # Check if the text contains mostly CJK characters, counting them in a single pass
+        cjk_count = sum(1 for c in text if c > "\u3000")
+        if cjk_count > len(text) * 0.5:
             return self.wrap_cjk_text(text, font)
 
         words = text.split()
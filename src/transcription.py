@@ -1,11 +1,40 @@
 #!/usr/bin/env python3
 """Transcription module for handling transcription results with timestamps."""
 
-import json
+import bisect
+import importlib.util
+import itertools
 import os
 import re
 import subprocess
-from typing import Any, Dict, List, Optional, Self
+from typing import Any, Callable, Dict, List, Optional, Self, Tuple
+
+import orjson
+
+# Optional dependency, fall back to the whisper.sh script. It is only imported by
+# _import_faster_whisper when a model is loaded, so runs that reuse saved lyrics start faster
+FASTER_WHISPER_AVAILABLE = importlib.util.find_spec("faster_whisper") is not None
+ctranslate2 = None
+BatchedInferencePipeline = None
+WhisperModel = None
+
+# Default number of VAD chunks decoded together by faster-whisper
+DEFAULT_BATCH_SIZE = 16
+
+# Default models, distil-large-v3 decodes English several times faster than large-v2 with a similar
+# error rate, but is English-only, so large-v2 is kept for Chinese
+DEFAULT_WHISPER_MODEL = "Systran/faster-distil-whisper-large-v3"
+DEFAULT_WHISPER_MULTILINGUAL_MODEL = "Systran/faster-whisper-large-v2"
+DEFAULT_WHISPER_CPP_MODEL = "models/ggml-large-v2.bin"  # Used by scripts/whisper.sh
+
+
+def _import_faster_whisper() -> None:
+    """Import faster-whisper and CTranslate2 on first use."""
+    global ctranslate2, BatchedInferencePipeline, WhisperModel
+    if WhisperModel is not None:
+        return
+    import ctranslate2
+    from faster_whisper import BatchedInferencePipeline, WhisperModel
 
 
 class Transcription:
@@ -14,6 +43,16 @@ class Transcription:
     def __init__(self) -> None:
         """Initialize an empty transcription object."""
         self.segments: List[Dict[str, Any]] = []  # List of segments with start_time, end_time, text
+        self.language: Optional[str] = None  # Language the segments were transcribed in
+        self.model_name: Optional[str] = None  # Whisper model the segments were transcribed with
+        # Segment start times and running maximum of end times for binary search,
+        # rebuilt when the segments list is replaced
+        self._starts: List[float] = []
+        self._max_ends: List[float] = []
+        self._search_key: Optional[Tuple[int, int]] = None
+        # Last window returned by get_segments_around_time, reused while the same segment is current
+        self._window: List[Dict[str, Any]] = []
+        self._window_key: Optional[Tuple[Any, ...]] = None
 
     def load_from_srt(self, srt_file_path: str) -> Optional[Self]:
         """Load transcription from a SRT subtitle file created by whisper-cli.
@@ -82,10 +121,12 @@ class Transcription:
             Self if loaded successfully, None otherwise
         """
         try:
-            with open(file_path) as f:
-                data = json.load(f)
+            with open(file_path, "rb") as f:
+                data = orjson.loads(f.read())
                 if "segments" in data:
                     self.segments = data["segments"]
+                    self.language = data.get("language")
+                    self.model_name = data.get("model")
                 else:
                     self.segments = data
             return self
@@ -93,23 +134,80 @@ class Transcription:
             print(f"Error loading transcription from {file_path}: {e}")
             return None
 
-    def save_to_file(self, file_path: str) -> bool:
+    def save_to_file(self, file_path: str, indent: bool = True) -> bool:
         """Save transcription to a JSON file.
 
         Args:
             file_path: Path where the JSON file should be saved
+            indent: Pretty-print the JSON for reading and editing, compact output is smaller and faster
 
         Returns:
             True if saved successfully, False otherwise
         """
+        # Write next to the target and swap it in, so an interrupted save never leaves a truncated file behind
+        temp_path = file_path + ".tmp"
         try:
-            with open(file_path, "w") as f:
-                json.dump({"segments": self.segments}, f, indent=2)
+            with open(temp_path, "wb") as f:
+                data: Dict[str, Any] = {"segments": self.segments}
+                if self.language:
+                    data["language"] = self.language
+                if self.model_name:
+                    data["model"] = self.model_name
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else None))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, file_path)
             return True
         except Exception as e:
             print(f"Error saving transcription to {file_path}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
             return False
 
+    def matches(self, language: str, model_name: str) -> bool:
+        """Check if the transcription was made with the given language and model.
+
+        Files saved without this information are assumed to match.
+
+        Args:
+            language: Language code (en, zh)
+            model_name: Name of the whisper model
+
+        Returns:
+            True if the transcription can be reused for the language and model, False otherwise
+        """
+        return (self.language is None or self.language == language) and (
+            self.model_name is None or self.model_name == model_name
+        )
+
+    def _segment_starts(self) -> List[float]:
+        """Get the start times of the segments, which are in time order.
+
+        Returns:
+            List of segment start times in seconds
+        """
+        key = (id(self.segments), len(self.segments))
+        if key != self._search_key:
+            self._starts = [segment["start"] for segment in self.segments]
+            self._max_ends = list(itertools.accumulate((segment["end"] for segment in self.segments), max))
+            self._search_key = key
+        return self._starts
+
+    def _find_segment(self, current_time: float) -> Optional[int]:
+        """Find the first segment containing the given time with binary searches instead of a scan.
+
+        Args:
+            current_time: Timestamp in seconds
+
+        Returns:
+            Index of the first segment containing the time, or None if none does
+        """
+        # Segments from this one on start after the time
+        after_idx = bisect.bisect_right(self._segment_starts(), current_time)
+        # The first segment ending at or after the time is where the running maximum reaches it
+        index = bisect.bisect_left(self._max_ends, current_time)
+        return index if index < after_idx else None
+
     def get_text_at_time(self, current_time: float) -> str:
         """Get the text at the given time.
 
@@ -119,10 +217,8 @@ class Transcription:
         Returns:
             Text of the segment active at the given time, or empty string if none
         """
-        for segment in self.segments:
-            if segment["start"] <= current_time <= segment["end"]:
-                return segment["text"]
-        return ""
+        index = self._find_segment(current_time)
+        return self.segments[index]["text"] if index is not None else ""
 
     def get_segments_around_time(self, current_time: float, before: int = 2, after: int = 2) -> List[Dict[str, Any]]:
         """Get segments around the current time including past and future segments.
@@ -133,21 +229,18 @@ class Transcription:
             after: Number of segments after the current one to include
 
         Returns:
-            List of segments with additional metadata (active status, index)
+            List of segments with additional metadata (active status, index), the same list is
+            returned again while the window does not change, so it must not be modified
         """
-        current_segment_idx = None
-
-        # Find the current segment first
-        for i, segment in enumerate(self.segments):
-            if segment["start"] <= current_time <= segment["end"]:
-                current_segment_idx = i
-                break
+        # Find the current segment first, it is the active one if it contains the time
+        current_segment_idx = self._find_segment(current_time)
+        is_active = current_segment_idx is not None
 
         if current_segment_idx is None:
             # If no current segment found, find the closest upcoming segment
-            upcoming = [(i, s) for i, s in enumerate(self.segments) if s["start"] > current_time]
-            if upcoming:
-                current_segment_idx = min(upcoming, key=lambda x: x[1]["start"])[0]
+            upcoming_idx = bisect.bisect_right(self._segment_starts(), current_time)
+            if upcoming_idx < len(self.segments):
+                current_segment_idx = upcoming_idx
             else:
                 # If no upcoming segment, use the last segment
                 current_segment_idx = len(self.segments) - 1 if self.segments else None
@@ -155,6 +248,11 @@ class Transcription:
         if current_segment_idx is None:
             return []
 
+        # The window only changes when another segment becomes current or the current one starts or ends
+        window_key = (self._search_key, current_segment_idx, is_active, before, after)
+        if window_key == self._window_key:
+            return self._window
+
         # Calculate the range of segments to return
         start_idx = max(0, current_segment_idx - before)
         end_idx = min(len(self.segments) - 1, current_segment_idx + after)
@@ -163,47 +261,85 @@ class Transcription:
         result = []
         for i in range(start_idx, end_idx + 1):
             segment = self.segments[i].copy()
-            segment["active"] = i == current_segment_idx and segment["start"] <= current_time <= segment["end"]
+            segment["active"] = i == current_segment_idx and is_active
             segment["index"] = i
             result.append(segment)
 
+        self._window = result
+        self._window_key = window_key
         return result
 
 
 class TranscriptionProcessor:
-    """Class to handle transcription of audio using whisper.sh script."""
+    """Class to handle transcription of audio using Whisper.
+
+    Runs faster-whisper (CTranslate2) in-process when it is installed, otherwise
+    falls back to whisper.cpp through the whisper.sh script.
+    """
+
+    # Loaded in-process models, keyed by model name, shared across instances
+    _models: Dict[str, Any] = {}
 
     def __init__(
         self,
         whisper_sh_path: str,
-        model_name: str,
+        model_name: Optional[str] = None,
         whisper_cpp_path: Optional[str] = None,
+        use_script: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
     ) -> None:
         """Initialize the transcription processor.
 
         Args:
             whisper_sh_path: Path to whisper.sh script
-            model_name: Name of the whisper model to use
+            model_name: Name of the whisper model to use, defaults to the backend's default model for the language
             whisper_cpp_path: Optional path to whisper.cpp directory
+            use_script: Force the whisper.sh script even if faster-whisper is available
+            batch_size: Number of speech chunks decoded together by faster-whisper, 1 disables batching
         """
         self.whisper_sh_path = whisper_sh_path
-        self.model_name = model_name
         self.whisper_cpp_path = whisper_cpp_path
+        self.batch_size = batch_size
+        self.use_script = use_script or not FASTER_WHISPER_AVAILABLE
+        self.model_name = model_name
+        if not model_name and self.use_script:
+            self.model_name = DEFAULT_WHISPER_CPP_MODEL
+
+    def get_model_name(self, language: str = "en") -> str:
+        """Get the whisper model used to transcribe the given language.
+
+        Args:
+            language: Language code (en, zh)
+
+        Returns:
+            The configured model name, or the default model for the language
+        """
+        if self.model_name:
+            return self.model_name
+        return DEFAULT_WHISPER_MODEL if language == "en" else DEFAULT_WHISPER_MULTILINGUAL_MODEL
 
     def transcribe(
-        self, audio_path: str, language: str = "en", output_dir: Optional[str] = None
+        self,
+        audio_path: str,
+        language: str = "en",
+        output_dir: Optional[str] = None,
+        progress_callback: Optional[Callable[[str], None]] = None,
     ) -> Optional[Transcription]:
-        """Transcribe audio file using whisper.sh.
+        """Transcribe audio file using whisper.
+
+        Transcribes in-process with faster-whisper by default. The whisper.cpp whisper.sh script is used
+        instead when faster-whisper is not installed or WHISPER_USE_SCRIPT is set.
 
         Args:
             audio_path: Path to the audio file to transcribe
             language: Language code (en, zh)
-            output_dir: Optional directory to save the transcription files
+            output_dir: Optional directory to save the transcription files (whisper.sh only)
+            progress_callback: Called with each progress line as it is produced, printed by default
 
         Returns:
             Transcription object if successful, None otherwise
         """
-        if not self.whisper_sh_path or not os.path.isfile(self.whisper_sh_path):
+        if self.use_script and (not self.whisper_sh_path or not os.path.isfile(self.whisper_sh_path)):
             print(f"Error: whisper.sh script not found at {self.whisper_sh_path}")
             return None
 
@@ -222,6 +358,169 @@ class TranscriptionProcessor:
         # Select prompt based on language
         current_prompt = prompts.get(language, prompts["en"])
 
+        # Language-specific max length based on empirical testing
+        max_length = 16 if language == "zh" else 60
+
+        report = progress_callback or print
+        if self.use_script:
+            transcription = self._transcribe_with_script(
+                audio_path, language, current_prompt, max_length, output_dir, report
+            )
+        else:
+            transcription = self._transcribe_in_process(audio_path, language, current_prompt, max_length, report)
+
+        # Record how the lyrics were made, so a saved transcription is only reused for the same settings
+        if transcription:
+            transcription.language = language
+            transcription.model_name = self.get_model_name(language)
+        return transcription
+
+    def preload_model(self, language: str = "en") -> bool:
+        """Load the in-process model ahead of transcription, e.g. while vocals are being separated.
+
+        Args:
+            language: Language code (en, zh) used to pick the default model
+
+        Returns:
+            True if the model is loaded, False if loading failed or whisper.sh is used
+        """
+        if self.use_script:
+            return False
+        try:
+            self._load_model(self.get_model_name(language))
+            return True
+        except Exception as e:
+            print(f"Error preloading whisper model: {e}")
+            return False
+
+    def _load_model(self, model_name: str) -> Any:
+        """Load the faster-whisper model once and reuse it for later transcriptions.
+
+        Uses INT8 weights with FP16 activations on CUDA and plain INT8 on CPU.
+
+        Args:
+            model_name: Name of the whisper model to load
+
+        Returns:
+            The loaded faster-whisper model
+        """
+        model = TranscriptionProcessor._models.get(model_name)
+        if model is None:
+            _import_faster_whisper()
+            if ctranslate2.get_cuda_device_count() > 0:
+                device, compute_type = "cuda", "int8_float16"
+            else:
+                device, compute_type = "cpu", "int8"
+            print(f"Loading whisper model: {model_name} ({device}, {compute_type})")
+            try:
+                # Load from the local Hugging Face cache without asking the hub for updates
+                model = WhisperModel(model_name, device=device, compute_type=compute_type, local_files_only=True)
+            except Exception:
+                print("Whisper model not found in the local cache, downloading...")
+                model = WhisperModel(model_name, device=device, compute_type=compute_type)
+            TranscriptionProcessor._models[model_name] = model
+        return model
+
+    def _transcribe_in_process(
+        self, audio_path: str, language: str, prompt: str, max_length: int, report: Callable[[str], None]
+    ) -> Optional[Transcription]:
+        """Transcribe audio in-process with faster-whisper.
+
+        Args:
+            audio_path: Path to the audio file to transcribe
+            language: Language code (en, zh)
+            prompt: Initial prompt to guide the transcription
+            max_length: Maximum segment length in characters
+            report: Called with a line for each decoded segment
+
+        Returns:
+            Transcription object if successful, None otherwise
+        """
+        try:
+            model = self._load_model(self.get_model_name(language))
+
+            print(f"Transcribing audio: {audio_path}")
+            options = {
+                "language": language,
+                "initial_prompt": prompt,
+                "word_timestamps": True,  # Used to split segments into lines of max_length
+                "vad_filter": True,
+            }
+            if self.batch_size > 1:
+                # Silero VAD cuts the audio on silence and the speech chunks are decoded in batches,
+                # returned segment timestamps are already relative to the start of the file
+                pipeline = BatchedInferencePipeline(model=model)
+                segments, _ = pipeline.transcribe(audio_path, batch_size=self.batch_size, **options)
+            else:
+                segments, _ = model.transcribe(audio_path, **options)
+
+            # Segments are decoded lazily while iterating
+            transcription = Transcription()
+            for segment in segments:
+                report(f"[{segment.start:.2f} --> {segment.end:.2f}] {segment.text.strip()}")
+                transcription.segments.extend(self._split_segment(segment, max_length))
+
+            print(f"Transcribed {len(transcription.segments)} segments")
+            return transcription
+
+        except Exception as e:
+            print(f"Error in transcription process: {e}")
+            return None
+
+    def _split_segment(self, segment: Any, max_length: int) -> List[Dict[str, Any]]:
+        """Split a decoded segment into lines of at most max_length characters.
+
+        Mirrors whisper.cpp's --max-length with --split-on-word, using word timestamps.
+
+        Args:
+            segment: faster-whisper segment with word timestamps
+            max_length: Maximum line length in characters
+
+        Returns:
+            List of segments with start, end and text
+        """
+        if not segment.words:
+            text = segment.text.strip()
+            return [{"start": segment.start, "end": segment.end, "text": text}] if text else []
+
+        lines: List[Dict[str, Any]] = []
+        text = ""
+        start = end = segment.start
+        for word in segment.words:
+            if text.strip() and len((text + word.word).strip()) > max_length:
+                lines.append({"start": start, "end": end, "text": text.strip()})
+                text = ""
+            if not text.strip():
+                start = word.start
+            text += word.word
+            end = word.end
+
+        if text.strip():
+            lines.append({"start": start, "end": end, "text": text.strip()})
+        return lines
+
+    def _transcribe_with_script(
+        self,
+        audio_path: str,
+        language: str,
+        prompt: str,
+        max_length: int,
+        output_dir: Optional[str],
+        report: Callable[[str], None],
+    ) -> Optional[Transcription]:
+        """Transcribe audio by running the whisper.sh script.
+
+        Args:
+            audio_path: Path to the audio file to transcribe
+            language: Language code (en, zh)
+            prompt: Initial prompt to guide the transcription
+            max_length: Maximum segment length in characters
+            output_dir: Optional directory to save the transcription files
+            report: Called with each line the script prints
+
+        Returns:
+            Transcription object if successful, None otherwise
+        """
         try:
             print(f"Transcribing audio: {audio_path}")
             if not output_dir:
@@ -230,9 +529,6 @@ class TranscriptionProcessor:
             # Ensure output directory exists
             os.makedirs(output_dir, exist_ok=True)
 
-            # Language-specific max length based on empirical testing
-            max_length = "16" if language == "zh" else "60"
-
             # Run whisper.sh script
             cmd = [
                 "bash",
@@ -246,11 +542,11 @@ class TranscriptionProcessor:
                 "-l",
                 language,
                 "--prompt",
-                current_prompt,
+                prompt,
                 "-f",
                 "srt",
                 "--max-length",
-                max_length,  # Different length for better readability based on language
+                str(max_length),  # Different length for better readability based on language
             ]
 
             if self.whisper_cpp_path:
@@ -271,7 +567,7 @@ class TranscriptionProcessor:
             # Display stdout in real-time
             print("\n--- Transcription process output ---")
             for line in process.stdout:
-                print(line.strip())
+                report(line.strip())
 
             # Wait for process to complete and get return code
             return_code = process.wait()
@@ -1,11 +1,17 @@
 #!/usr/bin/env python3
 """Utility functions for the Songs to Karaoke application."""
 
+import functools
+import hashlib
 import os
+import re
 import shutil
 import tempfile
 from typing import Dict, Optional, Tuple
 
+# Size the cache may take up on disk before the least recently used files are removed
+DEFAULT_CACHE_SIZE_LIMIT = 10 * 1024 * 1024 * 1024
+
 
 def create_temp_dir() -> str:
     """Create a temporary directory for processing files.
@@ -49,6 +55,152 @@ def create_project_dir(input_file: str, output_dir: Optional[str] = None) -> Tup
     return project_dir, base_name
 
 
+def get_cache_dir() -> str:
+    """Get the cache directory shared by all projects, creating it if needed.
+
+    Returns:
+        Path to songs-to-karaoke inside $XDG_CACHE_HOME, or ~/.cache if it is not set
+    """
+    cache_root = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser(os.path.join("~", ".cache"))
+    cache_dir = os.path.join(cache_root, "songs-to-karaoke")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash the content of a file, so identical audio is recognized under any name.
+
+    Files hashed before are not read again unless their size or modification time changed.
+
+    Args:
+        file_path: Path to the file to hash
+        chunk_size: Number of bytes read at a time
+
+    Returns:
+        First 16 hex digits of the SHA-256 digest
+    """
+    file_stat = os.stat(file_path)
+    return _hash_file_version(os.path.abspath(file_path), file_stat.st_size, file_stat.st_mtime_ns, chunk_size)
+
+
+@functools.lru_cache(maxsize=64)
+def _hash_file_version(file_path: str, size: int, mtime_ns: int, chunk_size: int) -> str:
+    """Hash one version of a file, identified by its size and modification time.
+
+    Args:
+        file_path: Absolute path to the file to hash
+        size: Size of the file in bytes
+        mtime_ns: Modification time of the file in nanoseconds
+        chunk_size: Number of bytes read at a time
+
+    Returns:
+        First 16 hex digits of the SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def get_cache_key(*parts: str) -> str:
+    """Join parts into a cache file name, replacing characters not allowed in file names.
+
+    Args:
+        parts: Parts of the key, e.g. content hash, model name and language
+
+    Returns:
+        Key usable as a file name
+    """
+    return "_".join(re.sub(r"[^\w.-]", "-", part) for part in parts)
+
+
+def link_or_copy(source: str, destination: str) -> None:
+    """Make a file available at destination without copying it where possible.
+
+    A hard link is preferred, as it keeps working if the source is removed. Paths on different
+    filesystems are symlinked instead, and the file is only copied if symlinks are not supported.
+
+    Args:
+        source: Path to the existing file
+        destination: Path where the file should be available
+    """
+    if os.path.lexists(destination):
+        os.remove(destination)
+    try:
+        os.link(source, destination)
+        return
+    except OSError:
+        pass
+    try:
+        os.symlink(os.path.abspath(source), destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+def move_file(source: str, destination: str) -> None:
+    """Move a file, renaming it in place when both paths are on the same filesystem.
+
+    Args:
+        source: Path to the file to move
+        destination: Path the file should be moved to
+    """
+    try:
+        os.replace(source, destination)
+    except OSError:
+        # Cross-device move, copyfile uses the kernel's sendfile instead of copying through Python buffers
+        shutil.copyfile(source, destination)
+        os.remove(source)
+
+
+def cache_file(file_path: str, cached_path: str) -> None:
+    """Move a file into the cache and link it back, so only one copy is kept on disk.
+
+    Args:
+        file_path: Path to the file to cache, where it stays available
+        cached_path: Path of the file in the cache
+    """
+    move_file(file_path, cached_path)
+    try:
+        link_or_copy(cached_path, file_path)
+    except OSError:
+        # Put the file back rather than leaving it only in the cache
+        move_file(cached_path, file_path)
+        raise
+
+
+def prune_cache(cache_dir: str, max_size: int = DEFAULT_CACHE_SIZE_LIMIT) -> None:
+    """Remove the least recently used files until the cache fits within max_size.
+
+    Files that are still hard linked from a project take no space of their own, so they are neither
+    counted nor removed.
+
+    Args:
+        cache_dir: Path to the cache directory
+        max_size: Number of bytes the cache may take up
+    """
+    cached_files = []
+    total_size = 0
+    for entry in os.scandir(cache_dir):
+        if not entry.is_file(follow_symlinks=False):
+            continue
+        entry_stat = entry.stat(follow_symlinks=False)
+        if entry_stat.st_nlink > 1:
+            continue
+        cached_files.append((entry_stat.st_mtime, entry_stat.st_size, entry.path))
+        total_size += entry_stat.st_size
+
+    # Files are touched when they are reused, so the oldest modification time was used least recently
+    for _, size, path in sorted(cached_files):
+        if total_size <= max_size:
+            break
+        try:
+            os.remove(path)
+            total_size -= size
+        except OSError as e:
+            print(f"Warning: Failed to remove cached file {path}: {e}")
+
+
 def load_env_file(env_path: Optional[str] = None) -> Dict[str, str]:
     """Load environment variables from .env file.
 
@@ -79,9 +231,22 @@ def load_env_file(env_path: Optional[str] = None) -> Dict[str, str]:
     return env_vars
 
 
+@functools.lru_cache(maxsize=1)
+def load_project_env_file() -> Dict[str, str]:
+    """Load the .env file in the project root once, shared by all environment lookups.
+
+    Returns:
+        Dictionary with environment variables
+    """
+    return load_env_file()
+
+
+@functools.lru_cache(maxsize=None)
 def get_env_path(key: str, default: Optional[str] = None) -> Optional[str]:
     """Get a path from environment variables, expanding user directory if needed.
 
+    Results are memoized, and the .env file is only read once for all keys.
+
     Args:
         key: Environment variable name
         default: Default value if not found
@@ -89,7 +254,7 @@ def get_env_path(key: str, default: Optional[str] = None) -> Optional[str]:
     Returns:
         Path string or default
     """
-    env_vars = load_env_file()
+    env_vars = load_project_env_file()
 
     # Check if exists in loaded .env file
     if key in env_vars:
@@ -99,3 +264,19 @@ def get_env_path(key: str, default: Optional[str] = None) -> Optional[str]:
     # Fall back to system environment variables
     value = os.environ.get(key, default)
     return os.path.expanduser(value) if value and "~" in value else value
+
+
+def get_env_flag(key: str, default: bool = False) -> bool:
+    """Get a boolean flag from environment variables.
+
+    Args:
+        key: Environment variable name
+        default: Default value if not found
+
+    Returns:
+        True if the variable is set to 1, true, yes or on (case-insensitive)
+    """
+    value = get_env_path(key)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
@@ -3,11 +3,13 @@
 Test cases for audio.py module
 """
 
+import subprocess
 import unittest.mock as mock
+import wave
 
 import pytest
 
-from audio import AudioProcessor
+from audio import AudioProcessor, VocalSeparator
 
 
 class TestAudioProcessor:
@@ -16,8 +18,83 @@ class TestAudioProcessor:
     @pytest.fixture
     def audio_processor(self):
         """Fixture to create an AudioProcessor instance"""
-        return AudioProcessor(vocal_remover_path="/path/to/vocal_remover")
+        return AudioProcessor(vocal_remover_path="/path/to/vocal_remover", use_script=True)
+
+    @staticmethod
+    def _write_wav(path, channels, sample_width, sample_rate):
+        """Write a short silent WAV file"""
+        with wave.open(str(path), "wb") as wav_file:
+            wav_file.setnchannels(channels)
+            wav_file.setsampwidth(sample_width)
+            wav_file.setframerate(sample_rate)
+            wav_file.writeframes(b"\x00" * channels * sample_width * 100)
+
+    @mock.patch("audio.DEMUCS_AVAILABLE", True)
+    def test_get_separator_name(self, audio_processor):
+        """Test stems from the script and from Demucs are told apart"""
+        # Execute and Assert
+        assert audio_processor.get_separator_name() == "vocal-remover"
+        assert AudioProcessor(vocal_remover_path=None).get_separator_name() == "htdemucs"
+
+    def test_is_pcm_wav(self, audio_processor, tmp_path):
+        """Test detecting WAV files that can be used without conversion"""
+        # Setup
+        compatible = tmp_path / "song.wav"
+        low_rate = tmp_path / "low_rate.wav"
+        wide_samples = tmp_path / "wide_samples.wav"
+        not_wav = tmp_path / "song.mp3"
+        self._write_wav(compatible, channels=2, sample_width=2, sample_rate=44100)
+        self._write_wav(low_rate, channels=1, sample_width=2, sample_rate=8000)
+        self._write_wav(wide_samples, channels=2, sample_width=3, sample_rate=44100)
+        not_wav.write_bytes(b"ID3")
+
+        # Execute and Assert
+        assert audio_processor.is_pcm_wav(str(compatible)) is True
+        assert audio_processor.is_pcm_wav(str(low_rate)) is False
+        assert audio_processor.is_pcm_wav(str(wide_samples)) is False
+        assert audio_processor.is_pcm_wav(str(not_wav)) is False
+        assert audio_processor.is_pcm_wav(str(tmp_path / "missing.wav")) is False
+
+    def test_is_pcm_wav_mono(self, audio_processor, tmp_path):
+        """Test mono WAV files are converted to the stereo input vocal separation needs"""
+        # Setup
+        mono = tmp_path / "mono.wav"
+        self._write_wav(mono, channels=1, sample_width=2, sample_rate=44100)
+
+        # Execute and Assert
+        assert audio_processor.is_pcm_wav(str(mono)) is False
+
+    def test_is_pcm_wav_for_asr(self, audio_processor, tmp_path):
+        """Test only 16 kHz mono WAV files are used for transcription without conversion"""
+        # Setup
+        asr_ready = tmp_path / "asr.wav"
+        stereo = tmp_path / "stereo.wav"
+        self._write_wav(asr_ready, channels=1, sample_width=2, sample_rate=16000)
+        self._write_wav(stereo, channels=2, sample_width=2, sample_rate=16000)
+
+        # Execute and Assert
+        assert audio_processor.is_pcm_wav(str(asr_ready), for_asr=True) is True
+        assert audio_processor.is_pcm_wav(str(stereo), for_asr=True) is False
+        assert audio_processor.is_pcm_wav(str(stereo)) is True
+
+    def test_prefetch(self, audio_processor, tmp_path):
+        """Test the kernel is asked to read ahead a file that is about to be processed"""
+        # Setup
+        input_file = tmp_path / "song.wav"
+        input_file.write_bytes(b"RIFF")
 
+        # Execute
+        with mock.patch("audio.os.posix_fadvise", create=True) as mock_fadvise, mock.patch(
+            "audio.os.POSIX_FADV_WILLNEED", 3, create=True
+        ):
+            audio_processor._prefetch(str(input_file))
+            audio_processor._prefetch(str(tmp_path / "missing.wav"))
+
+        # Assert
+        mock_fadvise.assert_called_once()
+        assert mock_fadvise.call_args[0][1:] == (0, 0, 3)
+
+    @mock.patch("audio.av", None)
     @mock.patch("audio.ffmpeg")
     def test_convert_to_wav_success(self, mock_ffmpeg, audio_processor):
         """Test successful conversion to WAV format"""
@@ -34,6 +111,7 @@ class TestAudioProcessor:
         mock_ffmpeg.input.return_value.output.assert_called_once()
         mock_ffmpeg.input.return_value.output.return_value.run.assert_called_once()
 
+    @mock.patch("audio.av", None)
     @mock.patch("audio.ffmpeg")
     def test_convert_to_wav_error_with_fallback(self, mock_ffmpeg, audio_processor):
         """Test WAV conversion with initial error but successful fallback"""
@@ -61,6 +139,7 @@ class TestAudioProcessor:
         first_input_mock.output.return_value.run.assert_called_once()
         second_input_mock.output.return_value.run.assert_called_once()
 
+    @mock.patch("audio.av", None)
     @mock.patch("audio.ffmpeg")
     def test_convert_to_wav_complete_failure(self, mock_ffmpeg, audio_processor):
         """Test WAV conversion with complete failure"""
@@ -77,9 +156,66 @@ class TestAudioProcessor:
         # Assert
         assert result is False
 
-    @mock.patch("audio.subprocess.Popen")
+    @mock.patch("audio.av")
+    @mock.patch("audio.ffmpeg")
+    def test_convert_to_wav_in_process(self, mock_ffmpeg, mock_av, audio_processor):
+        """Test WAV conversion with PyAV without spawning ffmpeg"""
+        # Setup
+        input_file = "input.mp3"
+        output_file = "output.wav"
+        input_container = mock.MagicMock()
+        output_container = mock.MagicMock()
+        mock_av.open.return_value.__enter__.side_effect = [input_container, output_container]
+        input_container.decode.return_value = [mock.MagicMock()]
+        mock_av.AudioResampler.return_value.resample.return_value = [mock.MagicMock()]
+
+        # Execute
+        result = audio_processor.convert_to_wav(input_file, output_file)
+
+        # Assert
+        assert result is True
+        mock_av.open.assert_any_call(input_file)
+        mock_av.open.assert_any_call(output_file, "w", format="wav")
+        output_container.add_stream.assert_called_once_with("pcm_s24le", rate=44100, layout="stereo")
+        input_container.decode.assert_called_once_with(audio=0)
+        mock_ffmpeg.input.assert_not_called()
+
+    @mock.patch("audio.av", None)
+    @mock.patch("audio.ffmpeg")
+    def test_convert_to_wav_for_asr(self, mock_ffmpeg, audio_processor):
+        """Test conversion to 16 kHz mono 16-bit PCM for transcription"""
+        # Setup
+        input_file = "vocals.wav"
+        output_file = "vocals_asr.wav"
+
+        # Execute
+        result = audio_processor.convert_to_wav(input_file, output_file, for_asr=True)
+
+        # Assert
+        assert result is True
+        mock_ffmpeg.input.return_value.output.assert_called_once_with(
+            output_file, ar=16000, ac=1, acodec="pcm_s16le", format="wav"
+        )
+
+    @mock.patch("audio.av")
+    @mock.patch("audio.ffmpeg")
+    def test_convert_to_wav_in_process_fallback(self, mock_ffmpeg, mock_av, audio_processor):
+        """Test WAV conversion falls back to ffmpeg when PyAV cannot decode the input"""
+        # Setup
+        input_file = "input.mp3"
+        output_file = "output.wav"
+        mock_av.open.side_effect = Exception("Unsupported codec")
+
+        # Execute
+        result = audio_processor.convert_to_wav(input_file, output_file)
+
+        # Assert
+        assert result is True
+        mock_ffmpeg.input.assert_called_once_with(input_file)
+
+    @mock.patch("audio.subprocess.run")
     @mock.patch("audio.os.path.exists")
-    def test_separate_vocals_success(self, mock_exists, mock_popen, audio_processor):
+    def test_separate_vocals_success(self, mock_exists, mock_run, audio_processor):
         """Test successful vocal separation"""
         # Setup
         input_file = "input.wav"
@@ -88,36 +224,26 @@ class TestAudioProcessor:
         instrumental_path = f"/output/dir/{base_name}_Instruments.wav"
         vocals_path = f"/output/dir/{base_name}_Vocals.wav"
 
-        # Initial check for existing files should return False, then True after "processing"
-        mock_exists.side_effect = lambda path: False
-
         # Mock process execution
-        process_mock = mock.MagicMock()
-        process_mock.returncode = 0
-        process_mock.communicate.return_value = (b"Output", b"")
-        mock_popen.return_value = process_mock
+        mock_run.return_value.returncode = 0
 
-        # After the subprocess runs, change the mock_exists behavior to find the files
-        def exists_side_effect(path):
-            # After communicate has been called, files should exist
-            if hasattr(process_mock.communicate, "call_count") and process_mock.communicate.call_count > 0:
-                return path in [instrumental_path, vocals_path]
-            return False
-
-        mock_exists.side_effect = exists_side_effect
+        # Files should only exist after the subprocess has run
+        mock_exists.side_effect = lambda path: mock_run.call_count > 0 and path in [instrumental_path, vocals_path]
 
         # Execute
         result = audio_processor.separate_vocals(input_file, output_dir)
 
         # Assert
         assert result == (instrumental_path, vocals_path)
-        mock_popen.assert_called_once()
-        process_mock.communicate.assert_called_once()
+        mock_run.assert_called_once()
+        assert mock_run.call_args[1]["stdout"] == subprocess.DEVNULL
+        cmd = mock_run.call_args[0][0]
+        assert cmd[cmd.index("--output_dir") + 1] == output_dir
 
-    @mock.patch("audio.subprocess.Popen")
+    @mock.patch("audio.subprocess.run")
     @mock.patch("audio.os.path.exists")
-    @mock.patch("audio.shutil.move")
-    def test_separate_vocals_file_relocation(self, mock_move, mock_exists, mock_popen, audio_processor):
+    @mock.patch("audio.os.replace")
+    def test_separate_vocals_file_relocation(self, mock_move, mock_exists, mock_run, audio_processor):
         """Test vocal separation with file relocation"""
         # Setup
         input_file = "input.wav"
@@ -133,10 +259,7 @@ class TestAudioProcessor:
         )
 
         # Mock process execution
-        process_mock = mock.MagicMock()
-        process_mock.returncode = 0
-        process_mock.communicate.return_value = (b"Output", b"")
-        mock_popen.return_value = process_mock
+        mock_run.return_value.returncode = 0
 
         # Execute
         result = audio_processor.separate_vocals(input_file, output_dir)
@@ -145,21 +268,143 @@ class TestAudioProcessor:
         assert result == (instrumental_path, vocals_path)
         assert mock_move.call_count == 2
 
-    @mock.patch("audio.subprocess.Popen")
-    def test_separate_vocals_error(self, mock_popen, audio_processor):
+    @mock.patch("audio.subprocess.run")
+    def test_separate_vocals_error(self, mock_run, audio_processor, capsys):
         """Test vocal separation with error"""
         # Setup
         input_file = "input.wav"
         output_dir = "/output/dir"
 
-        # Mock process execution with error
-        process_mock = mock.MagicMock()
-        process_mock.returncode = 1
-        process_mock.communicate.return_value = (b"", b"Error")
-        mock_popen.return_value = process_mock
+        # Mock process execution with error, writing to the stderr file like the real script would
+        def run_side_effect(cmd, **kwargs):
+            kwargs["stderr"].write(b"CUDA out of memory")
+            return mock.MagicMock(returncode=1)
+
+        mock_run.side_effect = run_side_effect
 
         # Execute
         result = audio_processor.separate_vocals(input_file, output_dir)
 
         # Assert
         assert result == (None, None)
+        assert "CUDA out of memory" in capsys.readouterr().out
+
+    @mock.patch("audio.VocalSeparator")
+    @mock.patch("audio.subprocess.run")
+    @mock.patch("audio.os.path.exists")
+    def test_separate_vocals_in_process(self, mock_exists, mock_run, mock_separator):
+        """Test vocal separation with Demucs without running the vocal-remover script"""
+        # Setup
+        mock_exists.return_value = False
+        mock_separator.return_value.separate.return_value = True
+        with mock.patch("audio.DEMUCS_AVAILABLE", True):
+            audio_processor = AudioProcessor(vocal_remover_path=None)
+
+        # Execute
+        result = audio_processor.separate_vocals("input.wav", "/output/dir")
+
+        # Assert
+        assert result == ("/output/dir/input_Instruments.wav", "/output/dir/input_Vocals.wav")
+        mock_separator.return_value.separate.assert_called_once_with(
+            "input.wav", "/output/dir/input_Instruments.wav", "/output/dir/input_Vocals.wav"
+        )
+        mock_run.assert_not_called()
+
+    @mock.patch("audio.DEMUCS_AVAILABLE", False)
+    def test_use_script_without_demucs(self):
+        """Test the vocal-remover script is used when Demucs is not installed"""
+        # Execute
+        audio_processor = AudioProcessor(vocal_remover_path="/path/to/vocal_remover")
+
+        # Assert
+        assert audio_processor.use_script is True
+
+
+class TestVocalSeparator:
+    """Test cases for the VocalSeparator class"""
+
+    @pytest.fixture
+    def mock_demucs(self):
+        """Fixture to mock torch, torchaudio and demucs, and clear the model cache"""
+        with mock.patch("audio.torch") as mock_torch, mock.patch("audio.torchaudio") as mock_torchaudio, mock.patch(
+            "audio.get_model"
+        ) as mock_get_model, mock.patch("audio.apply_model") as mock_apply_model, mock.patch(
+            "audio.save_audio"
+        ) as mock_save_audio, mock.patch.dict(VocalSeparator._models, clear=True):
+            mock_torch.cuda.is_available.return_value = False
+            mock_torch.quantization.quantize_dynamic.side_effect = lambda model, *args, **kwargs: model
+            model = mock_get_model.return_value.eval.return_value
+            model.half.return_value = model
+            model.samplerate = 44100
+            model.sources = ["drums", "bass", "other", "vocals"]
+            wav = mock.MagicMock()
+            mock_torchaudio.load.return_value = (wav, 44100)
+            yield mock.Mock(
+                torch=mock_torch,
+                model=model,
+                get_model=mock_get_model,
+                apply_model=mock_apply_model,
+                save_audio=mock_save_audio,
+                torchaudio=mock_torchaudio,
+            )
+
+    def test_separate(self, mock_demucs):
+        """Test separating vocals and saving both tracks"""
+        # Execute
+        result = VocalSeparator().separate("input.wav", "instruments.wav", "vocals.wav")
+
+        # Assert
+        assert result is True
+        mock_demucs.get_model.assert_called_once_with("htdemucs")
+        mock_demucs.apply_model.assert_called_once()
+        mock_demucs.torchaudio.functional.resample.assert_not_called()
+        saved_paths = [call[0][1] for call in mock_demucs.save_audio.call_args_list]
+        assert saved_paths == ["instruments.wav", "vocals.wav"]
+
+    def test_separate_quantizes_on_cpu(self, mock_demucs):
+        """Test linear layers are quantized to INT8 on CPU"""
+        # Execute
+        VocalSeparator().separate("input.wav", "instruments.wav", "vocals.wav")
+
+        # Assert
+        torch = mock_demucs.torch
+        torch.quantization.quantize_dynamic.assert_called_once_with(
+            mock_demucs.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        mock_demucs.model.half.assert_not_called()
+
+    def test_separate_fp16_on_cuda(self, mock_demucs):
+        """Test the model and input are cast to FP16 on CUDA"""
+        # Setup
+        mock_demucs.torch.cuda.is_available.return_value = True
+
+        # Execute
+        VocalSeparator().separate("input.wav", "instruments.wav", "vocals.wav")
+
+        # Assert
+        mock_demucs.model.half.assert_called_once()
+        mock_demucs.model.to.assert_called_once_with("cuda")
+        mock_demucs.torch.quantization.quantize_dynamic.assert_not_called()
+        assert mock_demucs.apply_model.call_args[1]["device"] == "cuda"
+
+    def test_separate_reuses_model(self, mock_demucs):
+        """Test the model is loaded once and shared between separations"""
+        # Execute
+        VocalSeparator().separate("first.wav", "first_instruments.wav", "first_vocals.wav")
+        VocalSeparator().separate("second.wav", "second_instruments.wav", "second_vocals.wav")
+
+        # Assert
+        mock_demucs.get_model.assert_called_once()
+        assert mock_demucs.apply_model.call_count == 2
+
+    def test_separate_error(self, mock_demucs):
+        """Test separation failure is reported instead of raised"""
+        # Setup
+        mock_demucs.apply_model.side_effect = RuntimeError("CUDA out of memory")
+
+        # Execute
+        result = VocalSeparator().separate("input.wav", "instruments.wav", "vocals.wav")
+
+        # Assert
+        assert result is False
+        mock_demucs.save_audio.assert_not_called()
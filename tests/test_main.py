@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Test cases for main.py module
+"""
+
+import argparse
+import os
+import unittest.mock as mock
+from concurrent.futures import Future
+
+import pytest
+
+import main
+from src.transcription import Transcription
+
+
+class TestProcessSong:
+    """Test cases for processing songs with the project directory and the cache"""
+
+    @pytest.fixture(autouse=True)
+    def cache_dir(self, tmp_path):
+        """Fixture to keep the cache inside the test directory"""
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": str(tmp_path / "cache")}):
+            yield tmp_path / "cache" / "songs-to-karaoke"
+
+    @pytest.fixture
+    def input_file(self, tmp_path):
+        """Fixture to create an input song"""
+        input_file = tmp_path / "song.mp3"
+        input_file.write_bytes(b"mp3 data")
+        return str(input_file)
+
+    @pytest.fixture
+    def args(self):
+        """Fixture to create the parsed command line arguments"""
+        return argparse.Namespace(
+            output_dir=None,
+            language="en",
+            skip_separation=False,
+            skip_transcription=False,
+            vocal_remover_path=None,
+        )
+
+    @pytest.fixture
+    def context(self):
+        """Fixture to create processors that write placeholder files instead of processing audio"""
+        audio_processor = mock.Mock()
+        audio_processor.use_script = False
+        audio_processor.get_separator_name.return_value = "htdemucs"
+        audio_processor.is_pcm_wav.return_value = False
+
+        def convert_to_wav(input_file, output_file, for_asr=False):
+            with open(output_file, "wb") as file:
+                file.write(b"wav data")
+            return True
+
+        def separate_vocals(input_file, output_dir):
+            base_name = os.path.splitext(os.path.basename(input_file))[0]
+            stems = []
+            for stem in ("Instruments", "Vocals"):
+                stem_path = os.path.join(output_dir, f"{base_name}_{stem}.wav")
+                with open(stem_path, "wb") as file:
+                    file.write(stem.encode())
+                stems.append(stem_path)
+            return tuple(stems)
+
+        audio_processor.convert_to_wav.side_effect = convert_to_wav
+        audio_processor.separate_vocals.side_effect = separate_vocals
+
+        transcription = Transcription()
+        transcription.segments = [{"start": 0.0, "end": 2.0, "text": "Hello world"}]
+        transcription.language = "en"
+        transcription.model_name = "test-model"
+        transcription_processor = mock.Mock()
+        transcription_processor.use_script = True
+        transcription_processor.get_model_name.return_value = "test-model"
+        transcription_processor.transcribe.return_value = transcription
+
+        return main.PipelineContext(audio_processor=audio_processor, transcription_processor=transcription_processor)
+
+    def test_process_song_cache_miss(self, input_file, args, context, cache_dir, tmp_path):
+        """Test a new song is converted, separated and transcribed, and its results are cached"""
+        # Execute
+        result = main.process_song(input_file, args, context, str(tmp_path))
+
+        # Assert
+        instrumental_path, vocals_path, transcription = result
+        assert instrumental_path == str(tmp_path / "song" / "song_Instruments.wav")
+        assert vocals_path == str(tmp_path / "song" / "song_Vocals.wav")
+        assert transcription.segments[0]["text"] == "Hello world"
+        context.audio_processor.convert_to_wav.assert_called_once()
+        context.audio_processor.separate_vocals.assert_called_once()
+        context.transcription_processor.transcribe.assert_called_once()
+        cached = sorted(os.listdir(cache_dir))
+        assert len(cached) == 3
+        assert any(name.endswith("_htdemucs_Instruments.wav") for name in cached)
+        assert any(name.endswith("_test-model_en.json") for name in cached)
+
+    def test_process_song_cache_hit(self, input_file, args, context, tmp_path):
+        """Test a song whose results are cached is neither converted, separated nor transcribed again"""
+        # Setup
+        main.process_song(input_file, args, context, str(tmp_path))
+        renamed = tmp_path / "renamed.mp3"
+        renamed.write_bytes(b"mp3 data")
+        context.audio_processor.reset_mock()
+        context.transcription_processor.transcribe.reset_mock()
+
+        # Execute
+        result = main.process_song(str(renamed), args, context, str(tmp_path))
+
+        # Assert
+        instrumental_path, vocals_path, transcription = result
+        assert open(instrumental_path, "rb").read() == b"Instruments"
+        assert open(vocals_path, "rb").read() == b"Vocals"
+        assert transcription.segments[0]["text"] == "Hello world"
+        context.audio_processor.convert_to_wav.assert_not_called()
+        context.audio_processor.separate_vocals.assert_not_called()
+        context.transcription_processor.transcribe.assert_not_called()
+
+    def test_process_song_transcription_from_other_model(self, input_file, args, context, tmp_path):
+        """Test a project transcription made with another model is not reused"""
+        # Setup
+        main.process_song(input_file, args, context, str(tmp_path))
+        context.transcription_processor.transcribe.reset_mock()
+        context.transcription_processor.get_model_name.return_value = "other-model"
+
+        # Execute
+        main.process_song(input_file, args, context, str(tmp_path))
+
+        # Assert
+        context.audio_processor.separate_vocals.assert_called_once()  # Stems are still reused
+        context.transcription_processor.transcribe.assert_called_once()
+
+    def test_process_song_background_conversion_failed(self, input_file, args, context, tmp_path):
+        """Test the song is converted again when the background conversion raised"""
+        # Setup
+        conversion = Future()
+        conversion.set_exception(OSError("Input/output error"))
+
+        # Execute
+        result = main.process_song(input_file, args, context, str(tmp_path), conversion)
+
+        # Assert
+        assert result is not None
+        context.audio_processor.convert_to_wav.assert_called_once()
+
+    def test_prefetch_wav_skipped_for_cached_stems(self, input_file, args, context, tmp_path):
+        """Test the next song is not converted ahead when its stems can be reused"""
+        # Setup
+        main.process_song(input_file, args, context, str(tmp_path))
+        context.audio_processor.reset_mock()
+
+        # Execute
+        result = main.prefetch_wav(input_file, str(tmp_path / "next.wav"), args, context)
+
+        # Assert
+        assert result is None
+        context.audio_processor.convert_to_wav.assert_not_called()
+
+
+class TestMain:
+    """Test cases for the main application flow"""
+
+    @mock.patch("main.KaraokePlayer")
+    @mock.patch("main.process_song")
+    @mock.patch("main.prefetch_wav")
+    @mock.patch("main.TranscriptionProcessor")
+    @mock.patch("main.AudioProcessor")
+    def test_main_stops_when_player_quit(
+        self, mock_audio_processor, mock_transcription_processor, mock_prefetch, mock_process, mock_player, tmp_path
+    ):
+        """Test the remaining songs are skipped when the user quits the player"""
+        # Setup
+        songs = [tmp_path / "first.mp3", tmp_path / "second.mp3"]
+        for song in songs:
+            song.write_bytes(b"mp3 data")
+        mock_process.return_value = ("instruments.wav", "vocals.wav", Transcription())
+        mock_player.return_value.play.return_value = True
+
+        # Execute
+        with mock.patch("sys.argv", ["main.py"] + [str(song) for song in songs]):
+            exit_code = main.main()
+
+        # Assert
+        assert exit_code == 0
+        mock_process.assert_called_once()
+        mock_player.return_value.quit.assert_called_once()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test cases for player.py module
+"""
+
+import struct
+import unittest.mock as mock
+import wave
+
+import pytest
+
+import player
+from player import KaraokePlayer, get_audio_format
+
+# GUID of the PCM subformat in a WAVE_FORMAT_EXTENSIBLE header
+PCM_SUBFORMAT = b"\x01\x00\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71"
+
+
+def write_24_bit_wav(path, channels, sample_rate):
+    """Write a short silent 24-bit WAVE_FORMAT_EXTENSIBLE file, like the separated stems"""
+    block_align = channels * 3
+    fmt = struct.pack(
+        "<HHIIHHHHI16s",
+        0xFFFE,  # WAVE_FORMAT_EXTENSIBLE
+        channels,
+        sample_rate,
+        sample_rate * block_align,
+        block_align,
+        24,
+        22,
+        24,
+        (1 << channels) - 1,
+        PCM_SUBFORMAT,
+    )
+    data = b"\x00" * block_align * 100
+    body = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", len(data)) + data
+    path.write_bytes(b"RIFF" + struct.pack("<I", len(body)) + body)
+
+
+class TestKaraokePlayer:
+    """Test cases for the KaraokePlayer class"""
+
+    @pytest.mark.skipif(player.av is None, reason="PyAV is not installed")
+    def test_get_audio_format_24_bit(self, tmp_path):
+        """Test reading the format of a 24-bit stem, which the wave module rejects"""
+        # Setup
+        stem = tmp_path / "song_Instruments.wav"
+        write_24_bit_wav(stem, channels=2, sample_rate=48000)
+
+        # Execute
+        result = get_audio_format(str(stem))
+
+        # Assert
+        assert result == (48000, 2)
+
+    @mock.patch("player.av", None)
+    def test_get_audio_format_without_av(self, tmp_path):
+        """Test reading the format of a PCM WAV file without PyAV"""
+        # Setup
+        song = tmp_path / "song.wav"
+        with wave.open(str(song), "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(22050)
+            wav_file.writeframes(b"\x00" * 200)
+
+        # Execute and Assert
+        assert get_audio_format(str(song)) == (22050, 1)
+        assert get_audio_format(str(tmp_path / "missing.wav")) is None
+
+    @pytest.mark.skipif(player.av is None, reason="PyAV is not installed")
+    @mock.patch("player.pygame.mixer")
+    def test_match_mixer_format_24_bit_stem(self, mock_mixer, tmp_path):
+        """Test the mixer is reinitialized at the format of a 24-bit stem"""
+        # Setup
+        stem = tmp_path / "song_Instruments.wav"
+        write_24_bit_wav(stem, channels=2, sample_rate=48000)
+        mock_mixer.get_init.return_value = (44100, -16, 2)
+
+        # Execute
+        KaraokePlayer._match_mixer_format(mock.Mock(), str(stem))
+
+        # Assert
+        mock_mixer.quit.assert_called_once()
+        mock_mixer.init.assert_called_once_with(frequency=48000, channels=2)
+
+    @mock.patch("player.pygame.mixer")
+    def test_match_mixer_format_unchanged(self, mock_mixer, tmp_path):
+        """Test the mixer is kept when it already has the format of the track"""
+        # Setup
+        mock_mixer.get_init.return_value = (48000, -16, 2)
+
+        # Execute
+        with mock.patch("player.get_audio_format", return_value=(48000, 2)):
+            KaraokePlayer._match_mixer_format(mock.Mock(), "song_Instruments.wav")
+
+        # Assert
+        mock_mixer.quit.assert_not_called()
+        mock_mixer.init.assert_not_called()
@@ -9,7 +9,13 @@ from io import StringIO
 
 import pytest
 
-from transcription import Transcription, TranscriptionProcessor
+from transcription import (
+    DEFAULT_WHISPER_CPP_MODEL,
+    DEFAULT_WHISPER_MODEL,
+    DEFAULT_WHISPER_MULTILINGUAL_MODEL,
+    Transcription,
+    TranscriptionProcessor,
+)
 
 
 class TestTranscription:
@@ -104,17 +110,13 @@ This is segment two
         # Execute and Assert
         assert transcription._parse_timestamp("00:00") == 0.0  # Invalid format returns 0.0
 
-    @mock.patch("json.load")
-    def test_load_from_file(self, mock_json_load):
+    def test_load_from_file(self):
         """Test loading transcription from JSON file"""
         # Setup
-        mock_json_load.return_value = {
-            "segments": [
-                {"start": 0.0, "end": 2.5, "text": "This is segment one"},
-                {"start": 2.5, "end": 5.0, "text": "This is segment two"},
-            ]
-        }
-        mock_open = mock.mock_open()
+        mock_open = mock.mock_open(
+            read_data=b'{"segments": [{"start": 0.0, "end": 2.5, "text": "This is segment one"}, '
+            b'{"start": 2.5, "end": 5.0, "text": "This is segment two"}]}'
+        )
 
         # Execute
         with mock.patch("builtins.open", mock_open):
@@ -125,16 +127,15 @@ This is segment two
         assert result is not None
         assert len(transcription.segments) == 2
         assert transcription.segments[1]["text"] == "This is segment two"
+        mock_open.assert_called_once_with("fake_path.json", "rb")
 
-    @mock.patch("json.load")
-    def test_load_from_file_flat_format(self, mock_json_load):
+    def test_load_from_file_flat_format(self):
         """Test loading transcription from JSON file with flat format (no segments key)"""
         # Setup
-        mock_json_load.return_value = [
-            {"start": 0.0, "end": 2.5, "text": "This is segment one"},
-            {"start": 2.5, "end": 5.0, "text": "This is segment two"},
-        ]
-        mock_open = mock.mock_open()
+        mock_open = mock.mock_open(
+            read_data=b'[{"start": 0.0, "end": 2.5, "text": "This is segment one"}, '
+            b'{"start": 2.5, "end": 5.0, "text": "This is segment two"}]'
+        )
 
         # Execute
         with mock.patch("builtins.open", mock_open):
@@ -145,12 +146,10 @@ This is segment two
         assert result is not None
         assert len(transcription.segments) == 2
 
-    @mock.patch("json.load")
-    def test_load_from_file_error(self, mock_json_load):
+    def test_load_from_file_error(self):
         """Test error handling when loading from JSON file"""
         # Setup
-        mock_json_load.side_effect = json.JSONDecodeError("Invalid JSON", "", 0)
-        mock_open = mock.mock_open()
+        mock_open = mock.mock_open(read_data=b"{invalid json")
 
         # Execute
         with mock.patch("builtins.open", mock_open):
@@ -160,8 +159,9 @@ This is segment two
         # Assert
         assert result is None
 
-    @mock.patch("json.dump")
-    def test_save_to_file(self, mock_json_dump):
+    @mock.patch("transcription.os.replace")
+    @mock.patch("transcription.os.fsync")
+    def test_save_to_file(self, mock_fsync, mock_replace):
         """Test saving transcription to JSON file"""
         # Setup
         transcription = Transcription()
@@ -177,16 +177,63 @@ This is segment two
 
         # Assert
         assert result is True
-        mock_open.assert_called_once_with("output.json", "w")
-        mock_json_dump.assert_called_once()
+        mock_open.assert_called_once_with("output.json.tmp", "wb")
+        mock_fsync.assert_called_once()
+        mock_replace.assert_called_once_with("output.json.tmp", "output.json")
+        written = mock_open.return_value.write.call_args[0][0]
+        assert json.loads(written) == {"segments": transcription.segments}
+
+    def test_save_to_file_compact(self, tmp_path):
+        """Test saving transcription to a JSON file without indentation"""
+        # Setup
+        file_path = tmp_path / "transcription.json"
+        transcription = Transcription()
+        transcription.segments = [{"start": 0.0, "end": 2.5, "text": "This is segment one"}]
 
-    @mock.patch("json.dump")
-    def test_save_to_file_error(self, mock_json_dump):
+        # Execute
+        result = transcription.save_to_file(str(file_path), indent=False)
+
+        # Assert
+        assert result is True
+        assert b"\n" not in file_path.read_bytes()
+        assert json.loads(file_path.read_bytes()) == {"segments": transcription.segments}
+
+    def test_save_and_load_metadata(self, tmp_path):
+        """Test the language and model are saved with the segments and loaded back"""
+        # Setup
+        file_path = str(tmp_path / "transcription.json")
+        transcription = Transcription()
+        transcription.segments = [{"start": 0.0, "end": 2.5, "text": "This is segment one"}]
+        transcription.language = "zh"
+        transcription.model_name = "test-model"
+
+        # Execute
+        transcription.save_to_file(file_path)
+        loaded = Transcription().load_from_file(file_path)
+
+        # Assert
+        assert loaded.segments == transcription.segments
+        assert loaded.language == "zh"
+        assert loaded.model_name == "test-model"
+
+    def test_matches(self, sample_transcription):
+        """Test a transcription is only reused for the language and model it was made with"""
+        # Setup
+        sample_transcription.language = "en"
+        sample_transcription.model_name = "test-model"
+
+        # Execute and Assert
+        assert sample_transcription.matches("en", "test-model") is True
+        assert sample_transcription.matches("zh", "test-model") is False
+        assert sample_transcription.matches("en", "other-model") is False
+        assert Transcription().matches("zh", "other-model") is True  # Saved without metadata
+
+    def test_save_to_file_error(self):
         """Test error handling when saving to JSON file"""
         # Setup
         transcription = Transcription()
         mock_open = mock.mock_open()
-        mock_json_dump.side_effect = Exception("Permission denied")
+        mock_open.return_value.write.side_effect = Exception("Permission denied")
 
         # Execute
         with mock.patch("builtins.open", mock_open):
@@ -195,6 +242,23 @@ This is segment two
         # Assert
         assert result is False
 
+    def test_save_to_file_error_keeps_existing_file(self, tmp_path):
+        """Test that a failed save leaves the previous file intact"""
+        # Setup
+        file_path = tmp_path / "transcription.json"
+        file_path.write_text('{"segments": []}')
+        transcription = Transcription()
+        transcription.segments = [{"start": 0.0, "end": 1.0, "text": "Hello"}]
+
+        # Execute
+        with mock.patch("transcription.orjson.dumps", side_effect=Exception("Serialization failed")):
+            result = transcription.save_to_file(str(file_path))
+
+        # Assert
+        assert result is False
+        assert file_path.read_text() == '{"segments": []}'
+        assert not (tmp_path / "transcription.json.tmp").exists()
+
     def test_get_text_at_time(self, sample_transcription):
         """Test getting text at a specific time"""
         # Execute and Assert
@@ -228,6 +292,30 @@ This is segment two
         assert len(segments_between) <= 2
         assert all(not segment.get("active", False) for segment in segments_between)
 
+    def test_get_text_at_time_after_segments_replaced(self, sample_transcription):
+        """Test the segment lookup follows a replaced segments list"""
+        # Setup
+        assert sample_transcription.get_text_at_time(1.0) == "This is segment one"
+
+        # Execute
+        sample_transcription.segments = [{"start": 0.5, "end": 1.5, "text": "Replaced segment"}]
+
+        # Assert
+        assert sample_transcription.get_text_at_time(1.0) == "Replaced segment"
+        assert sample_transcription.get_text_at_time(3.0) == ""
+
+    def test_get_segments_around_time_reuses_window(self, sample_transcription):
+        """Test the same window is returned until another segment becomes current"""
+        # Execute
+        first = sample_transcription.get_segments_around_time(1.0)
+        same_segment = sample_transcription.get_segments_around_time(2.0)
+        next_segment = sample_transcription.get_segments_around_time(3.0)
+
+        # Assert
+        assert same_segment is first
+        assert next_segment is not first
+        assert next_segment[0]["active"] is False
+
     def test_get_segments_around_time_empty(self):
         """Test getting segments around a time with empty segments list"""
         # Setup
@@ -256,7 +344,22 @@ class TestTranscriptionProcessor:
     @pytest.fixture
     def transcription_processor(self):
         """Create a sample TranscriptionProcessor for testing"""
-        return TranscriptionProcessor(whisper_sh_path="/path/to/whisper.sh", model_name="models/test-model.bin")
+        return TranscriptionProcessor(
+            whisper_sh_path="/path/to/whisper.sh", model_name="models/test-model.bin", use_script=True
+        )
+
+    @pytest.fixture
+    def mock_whisper_model(self):
+        """Patch the faster-whisper model class and reset the shared model cache"""
+        with mock.patch("transcription.WhisperModel") as model_cls, mock.patch(
+            "transcription.ctranslate2"
+        ) as mock_ct2, mock.patch("transcription.BatchedInferencePipeline") as pipeline_cls, mock.patch(
+            "transcription.FASTER_WHISPER_AVAILABLE", True
+        ), mock.patch.dict(TranscriptionProcessor._models, clear=True):
+            mock_ct2.get_cuda_device_count.return_value = 0
+            # Route batched transcription to the mocked model so tests can set a single return value
+            pipeline_cls.side_effect = lambda model: model
+            yield model_cls
 
     @mock.patch("subprocess.Popen")
     @mock.patch("os.path.isfile")
@@ -474,3 +577,180 @@ class TestTranscriptionProcessor:
             # Assert whisper_cpp_path was set in environment
             assert "WHISPER_CPP_PATH" in mock_environ
             assert mock_environ["WHISPER_CPP_PATH"] == "/path/to/whisper-cpp"
+
+    @staticmethod
+    def _word(start, end, word):
+        """Create a mock faster-whisper word"""
+        return mock.MagicMock(start=start, end=end, word=word)
+
+    def test_transcribe_in_process(self, mock_whisper_model):
+        """Test transcription with the in-process faster-whisper model"""
+        # Setup
+        segments = [
+            mock.MagicMock(start=0.0, end=2.5, text=" This is segment one", words=None),
+            mock.MagicMock(start=5.0, end=7.5, text=" ", words=None),
+        ]
+        mock_whisper_model.return_value.transcribe.return_value = (iter(segments), mock.MagicMock())
+        processor = TranscriptionProcessor(whisper_sh_path="/path/to/whisper.sh", model_name="test-model")
+
+        # Execute
+        with mock.patch("subprocess.Popen") as mock_popen:
+            result = processor.transcribe(audio_path="/path/to/audio.wav", language="zh")
+
+        # Assert
+        assert result.segments == [{"start": 0.0, "end": 2.5, "text": "This is segment one"}]
+        assert result.language == "zh"
+        assert result.model_name == "test-model"
+        mock_popen.assert_not_called()
+        mock_whisper_model.assert_called_once_with(
+            "test-model", device="cpu", compute_type="int8", local_files_only=True
+        )
+        assert mock_whisper_model.return_value.transcribe.call_args[1]["language"] == "zh"
+
+    def test_transcribe_in_process_progress_callback(self, mock_whisper_model):
+        """Test each decoded segment is reported to the progress callback"""
+        # Setup
+        segments = [mock.MagicMock(start=0.0, end=2.5, text=" This is segment one", words=None)]
+        mock_whisper_model.return_value.transcribe.return_value = (iter(segments), mock.MagicMock())
+        progress_callback = mock.MagicMock()
+        processor = TranscriptionProcessor(whisper_sh_path="/path/to/whisper.sh", batch_size=1)
+
+        # Execute
+        processor.transcribe("/path/to/audio.wav", progress_callback=progress_callback)
+
+        # Assert
+        progress_callback.assert_called_once_with("[0.00 --> 2.50] This is segment one")
+
+    def test_transcribe_in_process_batched(self, mock_whisper_model):
+        """Test the batch size is passed to the batched pipeline, or batching is skipped for 1"""
+        # Setup
+        mock_whisper_model.return_value.transcribe.side_effect = lambda *args, **kwargs: (iter([]), None)
+
+        # Execute
+        TranscriptionProcessor(whisper_sh_path="/path/to/whisper.sh", batch_size=8).transcribe("/path/to/audio.wav")
+        TranscriptionProcessor(whisper_sh_path="/path/to/whisper.sh", batch_size=1).transcribe("/path/to/audio.wav")
+
+        # Assert
+        first_call, second_call = mock_whisper_model.return_value.transcribe.call_args_list
+        assert first_call[1]["batch_size"] == 8
+        assert "batch_size" not in second_call[1]
+
+    def test_transcribe_in_process_splits_long_segments(self, mock_whisper_model):
+        """Test decoded segments are split into lines using word timestamps"""
+        # Setup
+        words = [
+            self._word(0.0, 1.0, " This is"),
+            self._word(1.0, 2.0, " segment one"),
+            self._word(2.0, 3.0, " and"),
+            self._word(3.0, 4.0, " segment two"),
+        ]
+        segment = mock.MagicMock(start=0.0, end=4.0, text="This is segment one and segment two", words=words)
+        mock_whisper_model.return_value.transcribe.return_value = (iter([segment]), mock.MagicMock())
+        processor = TranscriptionProcessor(whisper_sh_path="/path/to/whisper.sh", model_name="test-model")
+
+        # Execute
+        lines = processor._split_segment(segment, max_length=20)
+
+        # Assert
+        assert lines == [
+            {"start": 0.0, "end": 2.0, "text": "This is segment one"},
+            {"start": 2.0, "end": 4.0, "text": "and segment two"},
+        ]
+
+    def test_transcribe_in_process_reuses_model(self, mock_whisper_model):
+        """Test the in-process model is loaded once and shared across processors"""
+        # Setup
+        mock_whisper_model.return_value.transcribe.side_effect = lambda *args, **kwargs: (iter([]), None)
+
+        # Execute
+        for _ in range(2):
+            processor = TranscriptionProcessor(whisper_sh_path="/path/to/whisper.sh")
+            processor.transcribe(audio_path="/path/to/audio.wav", language="en")
+
+        # Assert
+        mock_whisper_model.assert_called_once()
+        assert mock_whisper_model.call_args[0][0] == DEFAULT_WHISPER_MODEL
+        assert mock_whisper_model.return_value.transcribe.call_count == 2
+
+    def test_transcribe_in_process_downloads_missing_model(self, mock_whisper_model):
+        """Test the model is downloaded when it is not in the local cache"""
+        # Setup
+        model = mock.MagicMock()
+        model.transcribe.return_value = (iter([]), None)
+        mock_whisper_model.side_effect = [FileNotFoundError("Model not cached"), model]
+        processor = TranscriptionProcessor(whisper_sh_path="/path/to/whisper.sh", model_name="test-model")
+
+        # Execute
+        result = processor.transcribe(audio_path="/path/to/audio.wav", language="en")
+
+        # Assert
+        assert result is not None
+        assert mock_whisper_model.call_args_list == [
+            mock.call("test-model", device="cpu", compute_type="int8", local_files_only=True),
+            mock.call("test-model", device="cpu", compute_type="int8"),
+        ]
+
+    def test_transcribe_in_process_default_model_per_language(self, mock_whisper_model):
+        """Test the English-only distil model is used for English and the multilingual model for Chinese"""
+        # Setup
+        mock_whisper_model.return_value.transcribe.side_effect = lambda *args, **kwargs: (iter([]), None)
+        processor = TranscriptionProcessor(whisper_sh_path="/path/to/whisper.sh")
+
+        # Execute
+        processor.transcribe(audio_path="/path/to/audio.wav", language="en")
+        processor.transcribe(audio_path="/path/to/audio.wav", language="zh")
+
+        # Assert
+        loaded_models = [call[0][0] for call in mock_whisper_model.call_args_list]
+        assert loaded_models == [DEFAULT_WHISPER_MODEL, DEFAULT_WHISPER_MULTILINGUAL_MODEL]
+        assert (
+            TranscriptionProcessor(whisper_sh_path="/path/to/whisper.sh", model_name="test-model").get_model_name("zh")
+            == "test-model"
+        )
+
+    def test_preload_model(self, mock_whisper_model):
+        """Test a preloaded model is reused by the following transcription"""
+        # Setup
+        mock_whisper_model.return_value.transcribe.side_effect = lambda *args, **kwargs: (iter([]), None)
+        processor = TranscriptionProcessor(whisper_sh_path="/path/to/whisper.sh")
+
+        # Execute
+        preloaded = processor.preload_model("zh")
+        processor.transcribe(audio_path="/path/to/audio.wav", language="zh")
+
+        # Assert
+        assert preloaded is True
+        mock_whisper_model.assert_called_once()
+        assert mock_whisper_model.call_args[0][0] == DEFAULT_WHISPER_MULTILINGUAL_MODEL
+
+    def test_preload_model_with_script(self, mock_whisper_model):
+        """Test nothing is preloaded when the whisper.sh script is used"""
+        # Setup
+        processor = TranscriptionProcessor(whisper_sh_path="/path/to/whisper.sh", use_script=True)
+
+        # Execute
+        result = processor.preload_model("en")
+
+        # Assert
+        assert result is False
+        mock_whisper_model.assert_not_called()
+
+    def test_transcribe_in_process_error(self, mock_whisper_model):
+        """Test error handling when the in-process model fails to load"""
+        # Setup
+        mock_whisper_model.side_effect = RuntimeError("Model not found")
+        processor = TranscriptionProcessor(whisper_sh_path="/path/to/whisper.sh")
+
+        # Execute
+        result = processor.transcribe(audio_path="/path/to/audio.wav", language="en")
+
+        # Assert
+        assert result is None
+
+    def test_use_script_without_faster_whisper(self):
+        """Test the whisper.sh script and its model are used when faster-whisper is not installed"""
+        with mock.patch("transcription.FASTER_WHISPER_AVAILABLE", False):
+            processor = TranscriptionProcessor(whisper_sh_path="/path/to/whisper.sh")
+
+        assert processor.use_script is True
+        assert processor.model_name == DEFAULT_WHISPER_CPP_MODEL
@@ -6,12 +6,38 @@ Test cases for utils.py module
 import os
 import unittest.mock as mock
 
-from utils import cleanup_temp_dir, create_project_dir, create_temp_dir, get_env_path, load_env_file
+import pytest
+
+from utils import (
+    cache_file,
+    cleanup_temp_dir,
+    create_project_dir,
+    create_temp_dir,
+    get_cache_dir,
+    get_cache_key,
+    get_env_flag,
+    get_env_path,
+    hash_file,
+    link_or_copy,
+    load_env_file,
+    load_project_env_file,
+    move_file,
+    prune_cache,
+)
 
 
 class TestUtils:
     """Test cases for utility functions in utils.py"""
 
+    @pytest.fixture(autouse=True)
+    def clear_env_cache(self):
+        """Fixture to clear memoized environment lookups between tests"""
+        get_env_path.cache_clear()
+        load_project_env_file.cache_clear()
+        yield
+        get_env_path.cache_clear()
+        load_project_env_file.cache_clear()
+
     @mock.patch("utils.tempfile.mkdtemp")
     def test_create_temp_dir(self, mock_mkdtemp):
         """Test creating a temporary directory"""
@@ -161,6 +187,20 @@ class TestUtils:
         mock_load_env_file.assert_called_once()
         mock_environ_get.assert_not_called()  # Should not fall back to os.environ
 
+    @mock.patch("utils.load_env_file")
+    def test_get_env_path_reads_env_file_once(self, mock_load_env_file):
+        """Test the .env file is read once for all keys"""
+        # Setup
+        mock_load_env_file.return_value = {"FIRST_PATH": "/first", "SECOND_PATH": "/second"}
+
+        # Execute
+        first = get_env_path("FIRST_PATH")
+        second = get_env_path("SECOND_PATH")
+
+        # Assert
+        assert (first, second) == ("/first", "/second")
+        mock_load_env_file.assert_called_once()
+
     @mock.patch("utils.load_env_file")
     @mock.patch("utils.os.environ.get")
     def test_get_env_path_from_system_env(self, mock_environ_get, mock_load_env_file):
@@ -208,3 +248,187 @@ class TestUtils:
         # Assert
         assert result == "/home/user/path/to/dir"
         mock_expanduser.assert_called_once_with("~/path/to/dir")
+
+    @mock.patch("utils.get_env_path")
+    def test_get_env_flag(self, mock_get_env_path):
+        """Test parsing boolean flags from environment variables"""
+        # Execute and Assert
+        mock_get_env_path.return_value = "1"
+        assert get_env_flag("TEST_FLAG") is True
+        mock_get_env_path.return_value = " True "
+        assert get_env_flag("TEST_FLAG") is True
+        mock_get_env_path.return_value = "0"
+        assert get_env_flag("TEST_FLAG", default=True) is False
+        mock_get_env_path.return_value = None
+        assert get_env_flag("TEST_FLAG", default=True) is True
+
+    def test_get_cache_dir(self, tmp_path):
+        """Test the cache directory is created inside XDG_CACHE_HOME"""
+        # Execute
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": str(tmp_path)}):
+            result = get_cache_dir()
+
+        # Assert
+        assert result == os.path.join(str(tmp_path), "songs-to-karaoke")
+        assert os.path.isdir(result)
+
+    def test_hash_file(self, tmp_path):
+        """Test files with identical content have the same hash regardless of name"""
+        # Setup
+        first = tmp_path / "song.wav"
+        second = tmp_path / "renamed.wav"
+        other = tmp_path / "other.wav"
+        first.write_bytes(b"audio" * 1000)
+        second.write_bytes(b"audio" * 1000)
+        other.write_bytes(b"other" * 1000)
+
+        # Execute
+        result = hash_file(str(first), chunk_size=64)
+
+        # Assert
+        assert len(result) == 16
+        assert result == hash_file(str(second))
+        assert result != hash_file(str(other))
+
+    def test_hash_file_reads_unchanged_file_once(self, tmp_path):
+        """Test an unchanged file is not read again, while a modified one is"""
+        # Setup
+        song = tmp_path / "song.wav"
+        song.write_bytes(b"audio" * 1000)
+
+        # Execute
+        with mock.patch("builtins.open", wraps=open) as mock_open:
+            first = hash_file(str(song))
+            second = hash_file(str(song))
+            song.write_bytes(b"other" * 2000)
+            modified = hash_file(str(song))
+
+        # Assert
+        assert first == second
+        assert modified != first
+        assert mock_open.call_count == 2
+
+    def test_get_cache_key(self):
+        """Test cache keys are safe to use as file names"""
+        # Execute
+        result = get_cache_key("0123abcd", "Systran/faster-whisper-large-v2", "en")
+
+        # Assert
+        assert result == "0123abcd_Systran-faster-whisper-large-v2_en"
+
+    def test_link_or_copy(self, tmp_path):
+        """Test linking a cached file, replacing an existing destination"""
+        # Setup
+        source = tmp_path / "cached.wav"
+        destination = tmp_path / "song_Vocals.wav"
+        source.write_bytes(b"cached")
+        destination.write_bytes(b"stale")
+
+        # Execute
+        link_or_copy(str(source), str(destination))
+
+        # Assert
+        assert destination.read_bytes() == b"cached"
+        assert os.path.samefile(source, destination)
+        assert not destination.is_symlink()
+
+    @mock.patch("utils.os.link")
+    def test_link_or_copy_symlink(self, mock_link, tmp_path):
+        """Test symlinking the file when it cannot be hard linked"""
+        # Setup
+        source = tmp_path / "cached.wav"
+        destination = tmp_path / "song_Vocals.wav"
+        source.write_bytes(b"cached")
+        mock_link.side_effect = OSError("Invalid cross-device link")
+
+        # Execute
+        link_or_copy(str(source), str(destination))
+
+        # Assert
+        assert destination.is_symlink()
+        assert destination.read_bytes() == b"cached"
+
+    @mock.patch("utils.os.symlink")
+    @mock.patch("utils.os.link")
+    def test_link_or_copy_fallback(self, mock_link, mock_symlink, tmp_path):
+        """Test copying the file when links are not supported"""
+        # Setup
+        source = tmp_path / "cached.wav"
+        destination = tmp_path / "song_Vocals.wav"
+        source.write_bytes(b"cached")
+        mock_link.side_effect = OSError("Hard links not supported")
+        mock_symlink.side_effect = OSError("Symlinks not supported")
+
+        # Execute
+        link_or_copy(str(source), str(destination))
+
+        # Assert
+        assert destination.read_bytes() == b"cached"
+        assert not destination.is_symlink()
+
+    @mock.patch("utils.os.remove")
+    @mock.patch("utils.shutil.copyfile")
+    @mock.patch("utils.os.replace")
+    def test_move_file_cross_device(self, mock_replace, mock_copyfile, mock_remove):
+        """Test moving a file across filesystems falls back to copy and remove"""
+        # Setup
+        mock_replace.side_effect = OSError("Invalid cross-device link")
+
+        # Execute
+        move_file("./input_Vocals.wav", "/cache/input_Vocals.wav")
+
+        # Assert
+        mock_copyfile.assert_called_once_with("./input_Vocals.wav", "/cache/input_Vocals.wav")
+        mock_remove.assert_called_once_with("./input_Vocals.wav")
+
+    def test_cache_file(self, tmp_path):
+        """Test a cached file is kept once on disk and stays available at its path"""
+        # Setup
+        stem = tmp_path / "song_Vocals.wav"
+        cached = tmp_path / "cache_Vocals.wav"
+        stem.write_bytes(b"vocals")
+
+        # Execute
+        cache_file(str(stem), str(cached))
+
+        # Assert
+        assert stem.read_bytes() == b"vocals"
+        assert os.path.samefile(stem, cached)
+
+    @mock.patch("utils.link_or_copy")
+    def test_cache_file_link_error(self, mock_link_or_copy, tmp_path):
+        """Test the file is moved back when it cannot be linked from the cache"""
+        # Setup
+        stem = tmp_path / "song_Vocals.wav"
+        cached = tmp_path / "cache_Vocals.wav"
+        stem.write_bytes(b"vocals")
+        mock_link_or_copy.side_effect = OSError("No space left on device")
+
+        # Execute
+        with pytest.raises(OSError):
+            cache_file(str(stem), str(cached))
+
+        # Assert
+        assert stem.read_bytes() == b"vocals"
+        assert not cached.exists()
+
+    def test_prune_cache(self, tmp_path):
+        """Test the least recently used files are removed until the cache fits"""
+        # Setup
+        for index, name in enumerate(["oldest.wav", "older.wav", "newest.wav"]):
+            path = tmp_path / name
+            path.write_bytes(b"x" * 100)
+            os.utime(path, (index, index))
+        linked = tmp_path / "linked.wav"
+        linked.write_bytes(b"x" * 1000)
+        os.utime(linked, (0, 0))
+        os.link(linked, tmp_path / "project_Vocals.wav")
+
+        # Execute
+        prune_cache(str(tmp_path), max_size=150)
+
+        # Assert
+        assert not (tmp_path / "oldest.wav").exists()
+        assert not (tmp_path / "older.wav").exists()
+        assert (tmp_path / "newest.wav").exists()
+        assert linked.exists()  # Still used by a project, so it takes no space of its own